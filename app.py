@@ -1,7 +1,6 @@
 # app.py (Clean endpoint architecture)
 import os
 import json
-from dotenv import load_dotenv
 from flask import Flask, jsonify, request, send_file
 from flask_cors import CORS
 import google.generativeai as genai
@@ -13,9 +12,9 @@ import tempfile
 #from marketing_image_pipeline import generate_images
 #from video_pipeline import generate_product_video
 from marketing_image_pipeline import generate_marketing_images
-from config import ENABLE_PROMPT_VIEW, PROMPT_DISPLAY_FILE
+from config import ENABLE_PROMPT_VIEW, PROMPT_DISPLAY_FILE, bootstrap
 
-load_dotenv()
+bootstrap()  # Loads .env and prepares working folders
 app = Flask(__name__)
 CORS(app)
 
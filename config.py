@@ -3,94 +3,78 @@ Configuration file for product video generation pipeline
 UPDATED: Testing flags and cost controls
 """
 import os
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
-
-# ===========================
-# Vertex AI Configuration
-# ===========================
-GOOGLE_CLOUD_PROJECT = os.getenv("GOOGLE_CLOUD_PROJECT")
-GOOGLE_CLOUD_LOCATION = os.getenv("GOOGLE_CLOUD_LOCATION", "us-central1")
-GOOGLE_GENAI_USE_VERTEXAI = os.getenv("GOOGLE_GENAI_USE_VERTEXAI", "True")
-
-# Set environment variables for SDK
-os.environ["GOOGLE_CLOUD_PROJECT"] = GOOGLE_CLOUD_PROJECT
-os.environ["GOOGLE_CLOUD_LOCATION"] = GOOGLE_CLOUD_LOCATION
-os.environ["GOOGLE_GENAI_USE_VERTEXAI"] = GOOGLE_GENAI_USE_VERTEXAI
-
-# Optional: Service account credentials
-if os.getenv("GOOGLE_APPLICATION_CREDENTIALS"):
-    os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
-
-# ===========================
-# UNSPLASH API (for testing)
-# ===========================
-UNSPLASH_ACCESS_KEY = os.getenv("UNSPLASH_ACCESS_KEY", "")
-UNSPLASH_SECRET_KEY = os.getenv("UNSPLASH_SECRET_KEY", "")
-
-TEST_IMAGES_FOLDER = "test_images_edit_pipeline"
-TEST_OUTPUTS_FOLDER = "test_outputs_edit_pipeline"
-# Testing configuration
-USE_UNSPLASH_FALLBACK = True 
-
-# ===========================
-# GCS Configuration
-# ===========================
-GCS_BUCKET_NAME = os.getenv("GCS_BUCKET_NAME")
-GCS_OUTPUT_PREFIX = "veo-product-videos"
-
-# ===========================
-# Model Configuration
-# ===========================
-TEXT_MODEL = "gemini-2.5-pro"
-VIDEO_MODEL = "veo-3.1-generate-preview"
-
-# ===========================
-# TESTING & COST CONTROL FLAGS for video
-# ===========================
-
-# NOTE: Temp files are ALWAYS deleted for deployment (ignoring this flag for cleanup)
-TESTING_MODE = True  # Set to False for production deployment
-
-ENABLE_PROMPT_VIEW = True  # Allow frontend to view generated prompts
-PROMPT_DISPLAY_FILE = "veo_generated_prompts_vertex.json"  # File to read prompts from
-
-PROMPT_ONLY_MODE = True  # Set to True to skip video generation (just test prompts)
-SAVE_PROMPTS_TO_FILE = True  # Save generated prompts to JSON
-
-GENERATE_AUDIO = False  # Disable audio to save credits
-USE_LOWER_RESOLUTION = True  # Set to True for "720p" (saves ~30% credits)
-
-import os
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
-
-# ===========================
-# Vertex AI Configuration
-# ===========================
-GOOGLE_CLOUD_PROJECT = os.getenv("GOOGLE_CLOUD_PROJECT")
-GOOGLE_CLOUD_LOCATION = os.getenv("GOOGLE_CLOUD_LOCATION", "us-central1")
-GOOGLE_GENAI_USE_VERTEXAI = os.getenv("GOOGLE_GENAI_USE_VERTEXAI", "True")
-
-# Set environment variables for SDK
-os.environ["GOOGLE_CLOUD_PROJECT"] = GOOGLE_CLOUD_PROJECT
-os.environ["GOOGLE_CLOUD_LOCATION"] = GOOGLE_CLOUD_LOCATION
-os.environ["GOOGLE_GENAI_USE_VERTEXAI"] = GOOGLE_GENAI_USE_VERTEXAI
-
-# Optional: Service account credentials
-if os.getenv("GOOGLE_APPLICATION_CREDENTIALS"):
-    os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
-
-# ===========================
-# UNSPLASH API (for testing)
+import sys
+import logging
+import functools
+from dataclasses import dataclass
+
+# ===========================
+# Environment Loading
+# ===========================
+# .env is parsed lazily: the first read of an env-backed setting
+# (e.g. config.GOOGLE_CLOUD_PROJECT) triggers _load_env_once(), so tools
+# that only need static constants never import dotenv.
+_ENV = None
+
+# Env-backed settings and their defaults
+_ENV_SETTINGS = {
+    # Vertex AI Configuration
+    "GOOGLE_CLOUD_PROJECT": None,
+    "GOOGLE_CLOUD_LOCATION": "us-central1",
+    "GOOGLE_GENAI_USE_VERTEXAI": "True",
+    # UNSPLASH API (for testing)
+    "UNSPLASH_ACCESS_KEY": "",
+    "UNSPLASH_SECRET_KEY": "",
+    # GCS Configuration
+    "GCS_BUCKET_NAME": None,
+}
+
+# Variables exported to os.environ for the Google SDKs
+_SDK_ENV_VARS = ("GOOGLE_CLOUD_PROJECT", "GOOGLE_CLOUD_LOCATION", "GOOGLE_GENAI_USE_VERTEXAI")
+
+
+def _load_env_once():
+    """Load .env and snapshot the environment on first use"""
+    global _ENV
+    if _ENV is None:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _ENV = os.environ.copy()
+
+        # Set environment variables for SDK
+        for key in _SDK_ENV_VARS:
+            value = _ENV.get(key, _ENV_SETTINGS[key])
+            if value is not None:
+                os.environ.setdefault(key, value)
+    return _ENV
+
+
+def _setting(name):
+    """Read a setting from inside this module, resolving lazy ones"""
+    if name in globals():
+        return globals()[name]
+    return __getattr__(name)
+
+
+def __getattr__(name):
+    """Resolve env-backed settings on first access and cache them as module attributes"""
+    if name in _ENV_SETTINGS:
+        value = _load_env_once().get(name, _ENV_SETTINGS[name])
+    elif name == "VIDEO_MODEL_ENDPOINT":
+        value = (
+            f"projects/{_setting('GOOGLE_CLOUD_PROJECT')}/locations/{_setting('GOOGLE_CLOUD_LOCATION')}"
+            f"/publishers/google/models/{VIDEO_MODEL}"
+        )
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    globals()[name] = value
+    return value
+
+
+# ===========================
+# Test Folders
 # ===========================
-UNSPLASH_ACCESS_KEY = os.getenv("UNSPLASH_ACCESS_KEY", "")
-UNSPLASH_SECRET_KEY = os.getenv("UNSPLASH_SECRET_KEY", "")
-
 TEST_IMAGES_FOLDER = "test_images_edit_pipeline"
 TEST_OUTPUTS_FOLDER = "test_outputs_edit_pipeline"
 # Testing configuration
@@ -99,7 +83,6 @@ USE_UNSPLASH_FALLBACK = True
 # ===========================
 # GCS Configuration
 # ===========================
-GCS_BUCKET_NAME = os.getenv("GCS_BUCKET_NAME")
 GCS_OUTPUT_PREFIX = "veo-product-videos"
 
 # GCS Folder Structure
@@ -119,8 +102,8 @@ DEBUG_MODE = True  # Set to False in production
 # ===========================
 TEXT_MODEL = "gemini-2.5-pro"  # For prompt generation
 VIDEO_MODEL = "veo-3.1-generate-preview"  # Veo 3.1
-VIDEO_MODEL_NAME = "veo-3.1-generate-preview" 
-VIDEO_MODEL_ENDPOINT = f"projects/{GOOGLE_CLOUD_PROJECT}/locations/{GOOGLE_CLOUD_LOCATION}/publishers/google/models/{VIDEO_MODEL}"
+VIDEO_MODEL_NAME = VIDEO_MODEL  # Alias kept for older callers
+# VIDEO_MODEL_ENDPOINT is resolved lazily in __getattr__ (needs project/location from .env)
 
 # ===========================
 # TESTING & COST CONTROL FLAGS for video
@@ -154,6 +137,8 @@ DEFAULT_SEGMENT_DURATION = 8  # 2 segments instead of 5
 MAX_IMAGES = 3
 MIN_SEGMENT_DURATION = 4
 MAX_SEGMENT_DURATION = 8
+MAX_CONCURRENT_SEGMENTS = 4  # Veo operations in flight at once per video
+VEO_REQUESTS_PER_MINUTE = 10  # Client-side cap on Veo submissions (project RPM quota)
 
 # ===========================
 # Video Quality Settings
@@ -176,6 +161,20 @@ MAX_RETRIES = 3
 RETRY_DELAY = 10  # seconds between retries
 OPERATION_POLL_INTERVAL = 30  # seconds between status checks
 OPERATION_TIMEOUT = 600  # 10 minutes max per operation
+SEGMENT_DEADLINE = 1800  # 30 minutes max per segment, across all retries
+
+
+@dataclass(frozen=True, slots=True)
+class Config:
+    """Immutable, slotted view of the retry/polling settings read inside loops"""
+    max_retries: int = MAX_RETRIES
+    retry_delay: int = RETRY_DELAY
+    operation_poll_interval: int = OPERATION_POLL_INTERVAL
+    operation_timeout: int = OPERATION_TIMEOUT
+    segment_deadline: int = SEGMENT_DEADLINE
+
+
+CFG = Config()
 
 # ===========================
 # E-Commerce Video Rules
@@ -198,11 +197,31 @@ PROMPT_LOG_FILE = os.path.join(LOG_FOLDER, "generated_prompts_log.txt")
 VEO_LOG_FILE = os.path.join(LOG_FOLDER, "veo_generation_log.txt")
 PIPELINE_LOG_FILE = os.path.join(LOG_FOLDER, "pipeline_log.txt")
 
-# Create necessary directories
-os.makedirs(LOG_FOLDER, exist_ok=True)
-os.makedirs(TEMP_VIDEO_FOLDER, exist_ok=True)
-os.makedirs(TEST_IMAGES_FOLDER, exist_ok=True)
-os.makedirs(TEST_OUTPUTS_FOLDER, exist_ok=True)
+
+@functools.lru_cache(maxsize=None)
+def ensure_dir(path):
+    """Create a directory on first use (once per process) and return its path"""
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def get_logger(name):
+    """
+    Return a console logger whose level follows DEBUG_MODE
+
+    Records go to stdout as bare messages through one handler attached on
+    first use; propagation is off so a root handler can't print them twice.
+    Detail belongs at DEBUG, which is skipped without formatting when
+    DEBUG_MODE is off.
+    """
+    logger = logging.getLogger(name)
+    logger.setLevel(logging.DEBUG if DEBUG_MODE else logging.INFO)
+    if not logger.handlers:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+    logger.propagate = False
+    return logger
 
 # ===========================
 # Template Configuration
@@ -210,8 +229,18 @@ os.makedirs(TEST_OUTPUTS_FOLDER, exist_ok=True)
 TEMPLATE_FOLDER = "templates"
 VEO_INSTRUCTION_TEMPLATE = os.path.join(TEMPLATE_FOLDER, "veo_instruction_template.txt")
 
-# Create template directory
-os.makedirs(TEMPLATE_FOLDER, exist_ok=True)
+# ===========================
+# Bootstrap
+# ===========================
+def bootstrap():
+    """
+    Perform config side effects once, from an entrypoint (Flask app / CLI):
+    load .env, export SDK environment variables and create working folders.
+    Modules that only read constants never need to call this.
+    """
+    _load_env_once()
+    ensure_dir(LOG_FOLDER)
+    ensure_dir(TEMP_VIDEO_FOLDER)
 
 # ===========================
 # Validation
@@ -219,8 +248,8 @@ os.makedirs(TEMPLATE_FOLDER, exist_ok=True)
 def validate_config():
     """Validate that all required configuration is present"""
     required_vars = [
-        ("GOOGLE_CLOUD_PROJECT", GOOGLE_CLOUD_PROJECT),
-        ("GCS_BUCKET_NAME", GCS_BUCKET_NAME),
+        ("GOOGLE_CLOUD_PROJECT", _setting("GOOGLE_CLOUD_PROJECT")),
+        ("GCS_BUCKET_NAME", _setting("GCS_BUCKET_NAME")),
     ]
     
     missing = [var_name for var_name, var_value in required_vars if not var_value]
@@ -229,15 +258,16 @@ def validate_config():
         raise ValueError(f"Missing required environment variables: {', '.join(missing)}")
     
     print("✅ Configuration validated successfully")
-    print(f"   Project: {GOOGLE_CLOUD_PROJECT}")
-    print(f"   Location: {GOOGLE_CLOUD_LOCATION}")
-    print(f"   Bucket: {GCS_BUCKET_NAME}")
+    print(f"   Project: {_setting('GOOGLE_CLOUD_PROJECT')}")
+    print(f"   Location: {_setting('GOOGLE_CLOUD_LOCATION')}")
+    print(f"   Bucket: {_setting('GCS_BUCKET_NAME')}")
     print(f"   Video Model: {VIDEO_MODEL}")
     print(f"   Resolution: {VIDEO_RESOLUTION}")
     print(f"   Audio: {'Enabled' if GENERATE_AUDIO else 'Disabled'}")
     print(f"   Prompt Only Mode: {'Yes' if PROMPT_ONLY_MODE else 'No'}")
 
 if __name__ == "__main__":
+    bootstrap()
     validate_config()
 """
 --------------------------------> version 1 <-----------------------------
@@ -261,17 +291,26 @@ EXTENSION_COUNT = 1      # Number of times to extend (max 20 per docs = 148s tot
 # If extension fails, try enabling this flag to use fast model
 USE_FAST_MODEL_FOR_EXTENSION = False  
 
+# Derived once at import (read these instead of calling a function per request)
+EXTENSION_MODEL = (
+    "veo-3.1-fast-generate-preview"
+    if ENABLE_VIDEO_EXTENSION and USE_FAST_MODEL_FOR_EXTENSION
+    else VIDEO_MODEL  # Uses your default veo-3.1-generate-preview
+)
+EFFECTIVE_DURATION = (
+    EXTENSION_BASE_DURATION + (EXTENSION_INCREMENT * EXTENSION_COUNT)
+    if ENABLE_VIDEO_EXTENSION
+    else DEFAULT_TOTAL_DURATION
+)
+
+# Kept for older callers
 def get_extension_model():
-    if ENABLE_VIDEO_EXTENSION and USE_FAST_MODEL_FOR_EXTENSION:
-        return "veo-3.1-fast-generate-preview"
-    return VIDEO_MODEL  # Uses your default veo-3.1-generate-preview
+    return EXTENSION_MODEL
 
 def get_effective_duration():
     if ENABLE_VIDEO_EXTENSION:
-        total = EXTENSION_BASE_DURATION + (EXTENSION_INCREMENT * EXTENSION_COUNT)
-        print(f"📏 Extension mode: {EXTENSION_BASE_DURATION}s base + {EXTENSION_COUNT} extensions = {total}s total")
-        return total
-    return DEFAULT_TOTAL_DURATION
+        print(f"📏 Extension mode: {EXTENSION_BASE_DURATION}s base + {EXTENSION_COUNT} extensions = {EFFECTIVE_DURATION}s total")
+    return EFFECTIVE_DURATION
 
 # Validation
 if ENABLE_VIDEO_EXTENSION:
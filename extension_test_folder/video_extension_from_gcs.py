@@ -3,19 +3,86 @@ Quick script to extend your already-generated video
 No need for operation ID - just the GCS path!
 """
 
+import os
+import sys
 import time
+import logging
+import random
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from google.auth import default
 from google.auth.transport.requests import Request
 
+# Shared project configuration lives in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+
+# Request/poll progress; banners and request details are DEBUG
+logger = config.get_logger("veo")
+
 # Your configuration
-PROJECT_ID = "gen-lang-client-0825799617"
-LOCATION = "us-central1"
+PROJECT_ID = config.GOOGLE_CLOUD_PROJECT
+LOCATION = config.GOOGLE_CLOUD_LOCATION
 GCS_BUCKET = "vertex-ai-veo-outputs"
 GCS_PREFIX = "veo-product-videos"
-MODEL_ID = "veo-3.1-generate-preview"
+MODEL_ID = config.VIDEO_MODEL
 BASE_URL = f"https://{LOCATION}-aiplatform.googleapis.com/v1"
 
+# Polling backoff: 2, 4, 8, 16, 30, 30, ... seconds with +/-20% jitter so
+# fast failures surface quickly and concurrent jobs don't poll in lockstep
+POLL_INITIAL_INTERVAL = 2
+POLL_MAX_INTERVAL = config.OPERATION_POLL_INTERVAL
+POLL_BACKOFF = 2
+POLL_JITTER = 0.2
+
+# Static endpoints and request parameters (built once per process)
+_MODEL_URL = f"{BASE_URL}/{config.VIDEO_MODEL_ENDPOINT}"
+_PREDICT_LR_URL = f"{_MODEL_URL}:predictLongRunning"
+_FETCH_OP_URL = f"{_MODEL_URL}:fetchPredictOperation"
+_EXTENDED_OUTPUT_URI = f"gs://{GCS_BUCKET}/{GCS_PREFIX}/extended/"
+_BASE_PARAMS = {
+    "storageUri": _EXTENDED_OUTPUT_URI,
+    "sampleCount": 1,
+    "aspectRatio": "16:9",
+    "resolution": "720p",
+    "personGeneration": "allow_adult"
+}
+
+
+# Cached Google credentials, resolved on first token request
+_CREDS = None
+
+# Shared HTTP session: keeps the TLS connection to Vertex AI alive across
+# generate/extend/poll calls. predictLongRunning is not idempotent (a
+# replayed submit starts and bills a second job), so submits only retry
+# 429s and failed connects; the read-only operation polls also retry 5xx.
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=4,
+    max_retries=Retry(
+        total=3,
+        read=0,
+        backoff_factor=1,
+        status_forcelist=[429],
+        allowed_methods=frozenset({"POST"}),
+        raise_on_status=False,
+    ),
+))
+_SESSION.mount(_FETCH_OP_URL, HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=4,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=1,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=frozenset({"POST"}),
+        raise_on_status=False,
+    ),
+))
+
 # YOUR GENERATED VIDEO PATH (update this!)
 EXISTING_VIDEO = "gs://vertex-ai-veo-outputs/veo-product-videos/10439118813818453868/sample_0.mp4"
 
@@ -28,31 +95,30 @@ minimalist background and studio lighting"""
 SEED = 12345
 
 
+def _base_headers():
+    """Request headers; only the bearer token varies between calls"""
+    return {
+        "Authorization": f"Bearer {get_access_token()}",
+        "Content-Type": "application/json"
+    }
+
+
 def get_access_token():
-    credentials, project = default()
-    credentials.refresh(Request())
-    return credentials.token
+    global _CREDS
+    if _CREDS is None:
+        _CREDS, _ = default()
+    # .valid is False when there is no token yet or it is about to expire
+    if not _CREDS.valid:
+        _CREDS.refresh(Request())
+    return _CREDS.token
 
 
 def extend_video(video_gcs_path, extension_prompt, seed=None):
     """Extend an existing video"""
-    url = f"{BASE_URL}/projects/{PROJECT_ID}/locations/{LOCATION}/publishers/google/models/{MODEL_ID}:predictLongRunning"
+    url = _PREDICT_LR_URL
+    headers = _base_headers()
     
-    headers = {
-        "Authorization": f"Bearer {get_access_token()}",
-        "Content-Type": "application/json"
-    }
-    
-    parameters = {
-        "storageUri": f"gs://{GCS_BUCKET}/{GCS_PREFIX}/extended/",
-        "sampleCount": 1,
-        "aspectRatio": "16:9",
-        "resolution": "720p",
-        "personGeneration": "allow_adult"
-    }
-    
-    if seed is not None:
-        parameters["seed"] = seed
+    parameters = {**_BASE_PARAMS, "seed": seed} if seed is not None else dict(_BASE_PARAMS)
     
     payload = {
         "instances": [
@@ -67,45 +133,45 @@ def extend_video(video_gcs_path, extension_prompt, seed=None):
         "parameters": parameters
     }
     
-    print("=" * 70)
-    print("🎬 EXTENDING YOUR VIDEO")
-    print("=" * 70)
-    print(f"Source: {video_gcs_path}")
-    print(f"Prompt: {extension_prompt}")
-    print(f"Output: gs://{GCS_BUCKET}/{GCS_PREFIX}/extended/")
-    print()
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("=" * 70)
+        logger.debug("🎬 EXTENDING YOUR VIDEO")
+        logger.debug("=" * 70)
+        logger.debug("Source: %s", video_gcs_path)
+        logger.debug("Prompt: %s", extension_prompt)
+        logger.debug("Output: %s\n", _EXTENDED_OUTPUT_URI)
     
-    response = requests.post(url, headers=headers, json=payload)
+    response = _SESSION.post(url, headers=headers, data=orjson.dumps(payload))
     
     if response.status_code == 200:
-        data = response.json()
+        data = orjson.loads(response.content)
         operation_name = data.get("name")
-        print(f"✅ Extension started!")
-        print(f"Operation: {operation_name.split('/')[-1]}")
+        logger.info("✅ Extension started!")
+        logger.info("Operation: %s", operation_name.rsplit("/", 1)[-1])
         return operation_name
     else:
-        print(f"❌ Error: {response.status_code}")
-        print(response.text)
+        logger.error("❌ Error: %s", response.status_code)
+        logger.error(response.text)
         return None
 
 
 def check_status(operation_name):
-    url = f"{BASE_URL}/projects/{PROJECT_ID}/locations/{LOCATION}/publishers/google/models/{MODEL_ID}:fetchPredictOperation"
-    
-    headers = {
-        "Authorization": f"Bearer {get_access_token()}",
-        "Content-Type": "application/json"
-    }
+    url = _FETCH_OP_URL
+    headers = _base_headers()
     
     payload = {"operationName": operation_name}
-    response = requests.post(url, headers=headers, json=payload)
+    response = _SESSION.post(url, headers=headers, data=orjson.dumps(payload))
     
-    return response.json() if response.status_code == 200 else None
+    return orjson.loads(response.content) if response.status_code == 200 else None
 
 
-def wait_for_completion(operation_name):
-    print("\n⏳ Waiting for extension to complete...\n")
+def wait_for_completion(operation_name, operation_id=None):
+    if operation_id is None:
+        operation_id = operation_name.rsplit("/", 1)[-1]
+    
+    logger.info("\n⏳ Waiting for extension %s to complete...\n", operation_id)
     start_time = time.time()
+    check_interval = POLL_INITIAL_INTERVAL
     
     while True:
         result = check_status(operation_name)
@@ -116,23 +182,24 @@ def wait_for_completion(operation_name):
         elapsed = int(time.time() - start_time)
         
         if result.get("done"):
-            print(f"\n✅ Completed! (Total time: {elapsed}s)")
+            logger.info("\n✅ Completed! (Total time: %ss)", elapsed)
             
             if "error" in result:
-                print(f"❌ Error: {result['error']}")
+                logger.error("❌ Error: %s", result["error"])
                 return None
             
             # Extract video path
-            videos = result.get("response", {}).get("videos", [])
-            if videos:
-                video_path = videos[0].get("gcsUri")
-                print(f"\n📹 Extended video: {video_path}")
-                return video_path
+            try:
+                video_path = result["response"]["videos"][0]["gcsUri"]
+            except (KeyError, IndexError, TypeError):
+                return None
             
-            return None
+            logger.info("\n📹 Extended video: %s", video_path)
+            return video_path
         
-        print(f"⏳ Processing... ({elapsed}s elapsed)")
-        time.sleep(30)
+        logger.debug("⏳ Processing %s... (%ss elapsed)", operation_id, elapsed)
+        time.sleep(check_interval * random.uniform(1 - POLL_JITTER, 1 + POLL_JITTER))
+        check_interval = min(check_interval * POLL_BACKOFF, POLL_MAX_INTERVAL)
 
 
 if __name__ == "__main__":
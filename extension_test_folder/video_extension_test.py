@@ -4,28 +4,104 @@ Tests video extension feature for product demo videos with 720p output
 """
 
 import os
+import sys
 import time
+import random
 import json
+import logging
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from google.auth import default
 from google.auth.transport.requests import Request
 
+# Shared project configuration lives in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+
+# Request/poll progress; banners and request details are DEBUG
+logger = config.get_logger("veo")
+
 # Configuration from your environment
-PROJECT_ID = "gen-lang-client-0825799617"
-LOCATION = "us-central1"
+PROJECT_ID = config.GOOGLE_CLOUD_PROJECT
+LOCATION = config.GOOGLE_CLOUD_LOCATION
 GCS_BUCKET = "vertex-ai-veo-outputs"
 GCS_PREFIX = "veo-product-videos"
 
 # Veo 3.1 model configuration
-MODEL_ID = "veo-3.0-generate-001"  # Veo 3.1 with extension support
+MODEL_ID = config.VIDEO_MODEL  # Veo 3.1 with extension support
 BASE_URL = f"https://{LOCATION}-aiplatform.googleapis.com/v1"
 
+# Polling backoff: 2, 4, 8, 16, 30, 30, ... seconds with +/-20% jitter so
+# fast failures surface quickly and concurrent jobs don't poll in lockstep
+POLL_INITIAL_INTERVAL = 2
+POLL_MAX_INTERVAL = config.OPERATION_POLL_INTERVAL
+POLL_BACKOFF = 2
+POLL_JITTER = 0.2
+
+# Static endpoints and request parameters (built once per process)
+_MODEL_URL = f"{BASE_URL}/{config.VIDEO_MODEL_ENDPOINT}"
+_PREDICT_LR_URL = f"{_MODEL_URL}:predictLongRunning"
+_FETCH_OP_URL = f"{_MODEL_URL}:fetchPredictOperation"
+_OUTPUT_URI = f"gs://{GCS_BUCKET}/{GCS_PREFIX}/"
+_EXTENDED_OUTPUT_URI = f"gs://{GCS_BUCKET}/{GCS_PREFIX}/extended/"
+_BASE_PARAMS = {
+    "sampleCount": 1,
+    "personGeneration": "allow_adult"
+}
+
+
+# Cached Google credentials, resolved on first token request
+_CREDS = None
+
+# Shared HTTP session: keeps the TLS connection to Vertex AI alive across
+# generate/extend/poll calls. predictLongRunning is not idempotent (a
+# replayed submit starts and bills a second job), so submits only retry
+# 429s and failed connects; the read-only operation polls also retry 5xx.
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=4,
+    max_retries=Retry(
+        total=3,
+        read=0,
+        backoff_factor=1,
+        status_forcelist=[429],
+        allowed_methods=frozenset({"POST"}),
+        raise_on_status=False,
+    ),
+))
+_SESSION.mount(_FETCH_OP_URL, HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=4,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=1,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=frozenset({"POST"}),
+        raise_on_status=False,
+    ),
+))
+
+
+def _base_headers():
+    """Request headers; only the bearer token varies between calls"""
+    return {
+        "Authorization": f"Bearer {get_access_token()}",
+        "Content-Type": "application/json"
+    }
+
 
 def get_access_token():
-    """Get Google Cloud access token for authentication"""
-    credentials, project = default()
-    credentials.refresh(Request())
-    return credentials.token
+    """Get Google Cloud access token for authentication (cached, refreshed only when expired)"""
+    global _CREDS
+    if _CREDS is None:
+        _CREDS, _ = default()
+    # .valid is False when there is no token yet or it is about to expire
+    if not _CREDS.valid:
+        _CREDS.refresh(Request())
+    return _CREDS.token
 
 
 def generate_initial_video(prompt, duration=8, aspect_ratio="16:9", resolution="720p", seed=None, generate_audio=False):
@@ -43,20 +119,15 @@ def generate_initial_video(prompt, duration=8, aspect_ratio="16:9", resolution="
     Returns:
         operation_name: Long-running operation identifier
     """
-    url = f"{BASE_URL}/projects/{PROJECT_ID}/locations/{LOCATION}/publishers/google/models/{MODEL_ID}:predictLongRunning"
-    
-    headers = {
-        "Authorization": f"Bearer {get_access_token()}",
-        "Content-Type": "application/json"
-    }
+    url = _PREDICT_LR_URL
+    headers = _base_headers()
     
     # Build parameters
     parameters = {
-        "storageUri": f"gs://{GCS_BUCKET}/{GCS_PREFIX}/",
-        "sampleCount": 1,
+        **_BASE_PARAMS,
+        "storageUri": _OUTPUT_URI,
         "aspectRatio": aspect_ratio,
         "resolution": resolution,  # Veo 3.1 supports 720p and 1080p
-        "personGeneration": "allow_adult"
     }
     
     if seed is not None:
@@ -73,30 +144,30 @@ def generate_initial_video(prompt, duration=8, aspect_ratio="16:9", resolution="
         "parameters": parameters
     }
     
-    print("=" * 70)
-    print("🎬 GENERATING INITIAL VIDEO WITH VEO 3.1")
-    print("=" * 70)
-    print(f"Model: {MODEL_ID}")
-    print(f"Prompt: {prompt}")
-    print(f"Duration: {duration}s | Aspect Ratio: {aspect_ratio} | Resolution: {resolution}")
-    if seed:
-        print(f"Seed: {seed} (for reproducibility)")
-    print(f"Audio: Native audio generation enabled")
-    print(f"Output: gs://{GCS_BUCKET}/{GCS_PREFIX}/")
-    print()
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("=" * 70)
+        logger.debug("🎬 GENERATING INITIAL VIDEO WITH VEO 3.1")
+        logger.debug("=" * 70)
+        logger.debug("Model: %s", MODEL_ID)
+        logger.debug("Prompt: %s", prompt)
+        logger.debug("Duration: %ss | Aspect Ratio: %s | Resolution: %s", duration, aspect_ratio, resolution)
+        if seed:
+            logger.debug("Seed: %s (for reproducibility)", seed)
+        logger.debug("Audio: Native audio generation enabled")
+        logger.debug("Output: %s\n", _OUTPUT_URI)
     
-    response = requests.post(url, headers=headers, json=payload)
+    response = _SESSION.post(url, headers=headers, data=orjson.dumps(payload))
     
     if response.status_code == 200:
-        data = response.json()
+        data = orjson.loads(response.content)
         operation_name = data.get("name")
-        operation_id = operation_name.split("/")[-1]
-        print(f"✅ Generation started!")
-        print(f"Operation ID: {operation_id}")
+        operation_id = operation_name.rsplit("/", 1)[-1]
+        logger.info("✅ Generation started!")
+        logger.info("Operation ID: %s", operation_id)
         return operation_name
     else:
-        print(f"❌ Error: {response.status_code}")
-        print(response.text)
+        logger.error("❌ Error: %s", response.status_code)
+        logger.error(response.text)
         return None
 
 
@@ -110,44 +181,43 @@ def check_operation_status(operation_name):
     Returns:
         dict: Operation status and results
     """
-    operation_id = operation_name.split("/")[-1]
-    url = f"{BASE_URL}/projects/{PROJECT_ID}/locations/{LOCATION}/publishers/google/models/{MODEL_ID}:fetchPredictOperation"
-    
-    headers = {
-        "Authorization": f"Bearer {get_access_token()}",
-        "Content-Type": "application/json"
-    }
+    url = _FETCH_OP_URL
+    headers = _base_headers()
     
     payload = {
         "operationName": operation_name
     }
     
-    response = requests.post(url, headers=headers, json=payload)
+    response = _SESSION.post(url, headers=headers, data=orjson.dumps(payload))
     
     if response.status_code == 200:
-        return response.json()
+        return orjson.loads(response.content)
     else:
-        print(f"❌ Error checking status: {response.status_code}")
-        print(response.text)
+        logger.error("❌ Error checking status: %s", response.status_code)
+        logger.error(response.text)
         return None
 
 
-def wait_for_completion(operation_name, task_name="Video generation"):
+def wait_for_completion(operation_name, task_name="Video generation", operation_id=None):
     """
     Wait for operation to complete with progress updates
     
     Args:
         operation_name: Operation identifier
         task_name: Description for logging
+        operation_id: Short operation ID for logging (derived once if omitted)
     
     Returns:
         dict: Final operation result
     """
-    print(f"\n⏳ Waiting for {task_name.lower()}...")
-    print("This may take several minutes...\n")
+    if operation_id is None:
+        operation_id = operation_name.rsplit("/", 1)[-1]
+    
+    logger.info("\n⏳ Waiting for %s (operation %s)...", task_name.lower(), operation_id)
+    logger.info("This may take several minutes...\n")
     
     start_time = time.time()
-    check_interval = 30  # Check every 30 seconds
+    check_interval = POLL_INITIAL_INTERVAL  # Doubles up to POLL_MAX_INTERVAL
     
     while True:
         result = check_operation_status(operation_name)
@@ -158,18 +228,19 @@ def wait_for_completion(operation_name, task_name="Video generation"):
         elapsed = int(time.time() - start_time)
         
         if result.get("done"):
-            print(f"\n✅ {task_name} completed! (Total time: {elapsed}s)")
+            logger.info("\n✅ %s completed! (Total time: %ss)", task_name, elapsed)
             
             # Check for errors
             if "error" in result:
-                print(f"❌ Error: {result['error']}")
+                logger.error("❌ Error: %s", result["error"])
                 return None
             
             return result
         
         # Show progress
-        print(f"⏳ Still processing... ({elapsed}s elapsed)")
-        time.sleep(check_interval)
+        logger.debug("⏳ Still processing %s... (%ss elapsed)", operation_id, elapsed)
+        time.sleep(check_interval * random.uniform(1 - POLL_JITTER, 1 + POLL_JITTER))
+        check_interval = min(check_interval * POLL_BACKOFF, POLL_MAX_INTERVAL)
 
 
 def extend_video(video_gcs_path, extension_prompt, aspect_ratio="16:9", resolution="720p", seed=None):
@@ -189,20 +260,15 @@ def extend_video(video_gcs_path, extension_prompt, aspect_ratio="16:9", resoluti
     Returns:
         operation_name: Long-running operation identifier
     """
-    url = f"{BASE_URL}/projects/{PROJECT_ID}/locations/{LOCATION}/publishers/google/models/{MODEL_ID}:predictLongRunning"
-    
-    headers = {
-        "Authorization": f"Bearer {get_access_token()}",
-        "Content-Type": "application/json"
-    }
+    url = _PREDICT_LR_URL
+    headers = _base_headers()
     
     # Build parameters - keep resolution at 720p for extension
     parameters = {
-        "storageUri": f"gs://{GCS_BUCKET}/{GCS_PREFIX}/extended/",
-        "sampleCount": 1,
+        **_BASE_PARAMS,
+        "storageUri": _EXTENDED_OUTPUT_URI,
         "aspectRatio": aspect_ratio,
         "resolution": resolution,  # Must be 720p for extension
-        "personGeneration": "allow_adult"
     }
     
     if seed is not None:
@@ -221,42 +287,47 @@ def extend_video(video_gcs_path, extension_prompt, aspect_ratio="16:9", resoluti
         "parameters": parameters
     }
     
-    print("\n" + "=" * 70)
-    print("🎬 EXTENDING VIDEO WITH VEO 3.1")
-    print("=" * 70)
-    print(f"Model: {MODEL_ID}")
-    print(f"Source video: {video_gcs_path}")
-    print(f"Extension prompt: {extension_prompt}")
-    print(f"Aspect Ratio: {aspect_ratio} | Resolution: {resolution}")
-    if seed:
-        print(f"Seed: {seed}")
-    print(f"Note: Extension adds ~7 seconds based on the final second of source")
-    print(f"Output: gs://{GCS_BUCKET}/{GCS_PREFIX}/extended/")
-    print()
-    
-    response = requests.post(url, headers=headers, json=payload)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("\n" + "=" * 70)
+        logger.debug("🎬 EXTENDING VIDEO WITH VEO 3.1")
+        logger.debug("=" * 70)
+        logger.debug("Model: %s", MODEL_ID)
+        logger.debug("Source video: %s", video_gcs_path)
+        logger.debug("Extension prompt: %s", extension_prompt)
+        logger.debug("Aspect Ratio: %s | Resolution: %s", aspect_ratio, resolution)
+        if seed:
+            logger.debug("Seed: %s", seed)
+        logger.debug("Note: Extension adds ~7 seconds based on the final second of source")
+        logger.debug("Output: %s\n", _EXTENDED_OUTPUT_URI)
+    
+    response = _SESSION.post(url, headers=headers, data=orjson.dumps(payload))
     
     if response.status_code == 200:
-        data = response.json()
+        data = orjson.loads(response.content)
         operation_name = data.get("name")
-        operation_id = operation_name.split("/")[-1]
-        print(f"✅ Extension started!")
-        print(f"Operation ID: {operation_id}")
+        operation_id = operation_name.rsplit("/", 1)[-1]
+        logger.info("✅ Extension started!")
+        logger.info("Operation ID: %s", operation_id)
         return operation_name
     else:
-        print(f"❌ Error: {response.status_code}")
-        print(response.text)
+        logger.error("❌ Error: %s", response.status_code)
+        logger.error(response.text)
         return None
 
 
 def extract_video_path(result):
     """Extract GCS path from operation result"""
     try:
-        predictions = result.get("response", {}).get("predictions", [])
-        if predictions and len(predictions) > 0:
-            return predictions[0].get("gcsUri")
-    except Exception as e:
-        print(f"Error extracting video path: {e}")
+        predictions = result["response"].get("predictions")
+        if not predictions:
+            # A finished operation can legitimately carry no videos
+            # (e.g. every sample removed by the safety filters)
+            logger.warning("⚠️ Operation finished without a generated video")
+            logger.debug("Operation response: %s", result["response"])
+            return None
+        return predictions[0]["gcsUri"]
+    except (KeyError, IndexError, TypeError, AttributeError) as e:
+        logger.warning("⚠️ Error extracting video path from malformed response: %r", e)
     return None
 
 
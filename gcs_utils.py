@@ -4,14 +4,87 @@ Handles upload, download, and organization of files in GCS
 """
 
 import os
+import sys
 import time
+import queue
+import atexit
+import logging
+import functools
+import mimetypes
+import concurrent.futures
 from datetime import datetime
+import google.auth
+import google_crc32c
+from google.auth.transport.requests import AuthorizedSession
 from google.cloud import storage
+from google.cloud.storage import transfer_manager
+from requests.adapters import HTTPAdapter
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 import config
 
-# Initialize GCS client
-storage_client = storage.Client(project=config.GOOGLE_CLOUD_PROJECT)
+# Transfer workers log through a queue; a single listener thread does the
+# actual stdout writes, so parallel uploads/downloads never block on it
+logger = logging.getLogger("gcs_utils")
+logger.setLevel(logging.INFO)
+logger.propagate = False
+if not logger.handlers:
+    _log_queue = queue.Queue(-1)
+    _stdout_handler = logging.StreamHandler(sys.stdout)
+    _stdout_handler.setFormatter(logging.Formatter("%(message)s"))
+    _log_listener = QueueListener(_log_queue, _stdout_handler)
+    _log_listener.start()
+    atexit.register(_log_listener.stop)  # Flush queued records on exit
+    logger.addHandler(QueueHandler(_log_queue))
+
+# Initialize GCS client on our own authorized session, with a connection
+# pool sized above the worker count so parallel transfers reuse keep-alive
+# sockets instead of opening new TLS connections. No adapter-level
+# max_retries: the storage library already retries transient errors.
+_credentials, _ = google.auth.default(scopes=storage.Client.SCOPE)
+_http_session = AuthorizedSession(_credentials)
+_http_session.mount("https://", HTTPAdapter(pool_connections=64, pool_maxsize=64))
+storage_client = storage.Client(
+    project=config.GOOGLE_CLOUD_PROJECT,
+    credentials=_credentials,
+    _http=_http_session
+)
+
+# Upper bound on concurrent upload/download workers
+MAX_TRANSFER_WORKERS = 16
+MAX_DOWNLOAD_WORKERS = 8
+
+# Transfers are checksummed with CRC32C (never MD5); the pure-Python
+# fallback is far slower than the C extension
+if google_crc32c.implementation != "c":
+    logger.warning("⚠️ google-crc32c C extension not available, checksums will use the slow Python fallback")
+
+# Objects whose size the caller knows to be above this are fetched as
+# concurrent 16 MiB byte ranges; everything else is a single checksummed GET
+_GCS_PARALLEL_DOWNLOAD_THRESHOLD = 32 << 20
+_GCS_DOWNLOAD_RANGE_SIZE = 16 << 20
+_GCS_PARALLEL_DOWNLOAD_WORKERS = 4
+
+# Content types for the file extensions the pipeline uploads
+_CONTENT_TYPES = {
+    ".mp4": "video/mp4",
+    ".mov": "video/quicktime",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".png": "image/png",
+    ".webp": "image/webp",
+}
+
+# Bucket handle for the pipeline bucket (reused by every call)
+_BUCKET = storage_client.bucket(config.GCS_BUCKET_NAME)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_bucket(bucket_name):
+    """Return a cached bucket handle for an arbitrary bucket name"""
+    if bucket_name == config.GCS_BUCKET_NAME:
+        return _BUCKET
+    return storage_client.bucket(bucket_name)
 
 
 def get_project_folder_name(project_id=None):
@@ -66,37 +139,38 @@ def upload_to_gcs(local_file_path, gcs_path, content_type=None):
         str: Full GCS URI (gs://bucket/path)
     """
     try:
-        bucket = storage_client.bucket(config.GCS_BUCKET_NAME)
-        blob = bucket.blob(gcs_path)
+        # The library sends files up to 8 MiB as one multipart request and
+        # larger ones resumably in 100 MiB chunks
+        blob = _BUCKET.blob(gcs_path)
         
         # Auto-detect content type if not provided
         if not content_type:
-            if local_file_path.endswith('.mp4'):
-                content_type = 'video/mp4'
-            elif local_file_path.endswith(('.jpg', '.jpeg')):
-                content_type = 'image/jpeg'
-            elif local_file_path.endswith('.png'):
-                content_type = 'image/png'
+            content_type = (
+                _CONTENT_TYPES.get(os.path.splitext(local_file_path)[1].lower())
+                or mimetypes.guess_type(local_file_path)[0]
+            )
         
-        blob.upload_from_filename(local_file_path, content_type=content_type)
+        blob.upload_from_filename(local_file_path, content_type=content_type, checksum="crc32c")
         
         gcs_uri = f"gs://{config.GCS_BUCKET_NAME}/{gcs_path}"
-        print(f"✅ Uploaded: {local_file_path} -> {gcs_uri}")
+        logger.info("✅ Uploaded: %s -> %s", local_file_path, gcs_uri)
         
         return gcs_uri
         
     except Exception as e:
-        print(f"❌ Upload failed: {e}")
+        logger.error("❌ Upload failed: %s", e)
         raise
 
 
-def download_from_gcs(gcs_uri, local_file_path):
+def download_from_gcs(gcs_uri, local_file_path, size=None):
     """
     Download a file from Google Cloud Storage
     
     Args:
         gcs_uri: Full GCS URI (gs://bucket/path) or just path
         local_file_path: Destination path for downloaded file
+        size: Optional object size in bytes, if already known (e.g. from a
+            listing); objects over 32 MiB are then fetched as byte ranges
     
     Returns:
         str: Path to downloaded file
@@ -110,51 +184,89 @@ def download_from_gcs(gcs_uri, local_file_path):
         bucket_name = parts[0]
         blob_path = parts[1] if len(parts) > 1 else ""
         
-        bucket = storage_client.bucket(bucket_name)
-        blob = bucket.blob(blob_path)
+        blob = _get_bucket(bucket_name).blob(blob_path)
         
         # Create directory if it doesn't exist
         os.makedirs(os.path.dirname(local_file_path), exist_ok=True)
         
-        blob.download_to_filename(local_file_path)
+        if size and size > _GCS_PARALLEL_DOWNLOAD_THRESHOLD:
+            # Large object: split into byte ranges and GET them concurrently
+            transfer_manager.download_chunks_concurrently(
+                blob,
+                local_file_path,
+                chunk_size=_GCS_DOWNLOAD_RANGE_SIZE,
+                max_workers=_GCS_PARALLEL_DOWNLOAD_WORKERS,
+                worker_type=transfer_manager.THREAD
+            )
+        else:
+            blob.download_to_filename(local_file_path)
         
-        print(f"✅ Downloaded: gs://{bucket_name}/{blob_path} -> {local_file_path}")
+        logger.info("✅ Downloaded: gs://%s/%s -> %s", bucket_name, blob_path, local_file_path)
         
         return local_file_path
         
     except Exception as e:
-        print(f"❌ Download failed: {e}")
+        logger.error("❌ Download failed: %s", e)
         raise
 
 
-def upload_reference_images(image_paths, project_id=None):
+def upload_reference_images(image_paths, project_id=None, skip_existing=False, gcs_paths=None):
     """
     Upload reference images to GCS inputs folder
     
     Args:
         image_paths: List of local image file paths
         project_id: Optional custom project ID
+        gcs_paths: Optional paths dict from get_gcs_paths(); pass the
+            pipeline's dict so every step uses the same project folder
+        skip_existing: If True, images already present in the inputs folder
+            (e.g. when re-running a custom project_id) are not uploaded again
     
     Returns:
         list: List of GCS URIs for uploaded images
     """
-    gcs_paths = get_gcs_paths(project_id)
-    uploaded_uris = []
+    if gcs_paths is None:
+        gcs_paths = get_gcs_paths(project_id)
     
-    print(f"\n📤 Uploading {len(image_paths)} reference image(s)...")
+    logger.info("\n📤 Uploading %d reference image(s)...", len(image_paths))
     
+    # Keep the original 1-based index so GCS names match the input order
+    targets = []
     for idx, image_path in enumerate(image_paths, 1):
-        if not os.path.exists(image_path):
-            print(f"⚠️ Image not found: {image_path}")
+        if not os.path.isfile(image_path):
+            logger.warning("⚠️ Image not found: %s", image_path)
             continue
         
         filename = os.path.basename(image_path)
-        gcs_path = f"{gcs_paths['inputs']}/reference_{idx}_{filename}"
-        
-        gcs_uri = upload_to_gcs(image_path, gcs_path)
-        uploaded_uris.append(gcs_uri)
-    
-    print(f"✅ Uploaded {len(uploaded_uris)} reference image(s)")
+        targets.append((idx, image_path, f"{gcs_paths['inputs']}/reference_{idx}_{filename}"))
+    
+    # One listing call tells us which targets already exist in GCS
+    results = {}
+    if skip_existing and targets:
+        existing = {
+            blob.name
+            for blob in _BUCKET.list_blobs(prefix=f"{gcs_paths['inputs']}/", fields="items(name),nextPageToken")
+        }
+        for idx, _, gcs_path in targets:
+            if gcs_path in existing:
+                results[idx] = f"gs://{config.GCS_BUCKET_NAME}/{gcs_path}"
+        if results:
+            logger.info("   Skipping %d image(s) already in GCS", len(results))
+    
+    # Upload concurrently; results are placed back in input order
+    pending = [target for target in targets if target[0] not in results]
+    if pending:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(MAX_TRANSFER_WORKERS, len(pending))) as executor:
+            futures = {
+                executor.submit(upload_to_gcs, image_path, gcs_path): idx
+                for idx, image_path, gcs_path in pending
+            }
+            for future in concurrent.futures.as_completed(futures):
+                results[futures[future]] = future.result()
+    
+    uploaded_uris = [results[idx] for idx, _, _ in targets]
+    
+    logger.info("✅ Uploaded %d reference image(s)", len(uploaded_uris))
     
     return uploaded_uris
 
@@ -173,23 +285,54 @@ def download_segment_videos(segment_gcs_uris, local_folder=None):
     if not local_folder:
         local_folder = config.TEMP_VIDEO_FOLDER
     
-    os.makedirs(local_folder, exist_ok=True)
+    config.ensure_dir(local_folder)
     
-    local_paths = []
+    local_paths = [
+        os.path.join(local_folder, f"segment_{idx}.mp4")
+        for idx in range(1, len(segment_gcs_uris) + 1)
+    ]
     
-    print(f"\n📥 Downloading {len(segment_gcs_uris)} video segment(s)...")
+    logger.info("\n📥 Downloading %d video segment(s)...", len(segment_gcs_uris))
     
-    for idx, gcs_uri in enumerate(segment_gcs_uris, 1):
-        local_path = os.path.join(local_folder, f"segment_{idx}.mp4")
-        download_from_gcs(gcs_uri, local_path)
-        local_paths.append(local_path)
+    # Download concurrently; local_paths is already in segment order
+    if segment_gcs_uris:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(MAX_DOWNLOAD_WORKERS, len(segment_gcs_uris))) as executor:
+            futures = [
+                executor.submit(download_from_gcs, gcs_uri, local_path)
+                for gcs_uri, local_path in zip(segment_gcs_uris, local_paths)
+            ]
+            for future in concurrent.futures.as_completed(futures):
+                future.result()
     
-    print(f"✅ Downloaded {len(local_paths)} segment(s) to {local_folder}")
+    logger.info("✅ Downloaded %d segment(s) to %s", len(local_paths), local_folder)
     
     return local_paths
 
 
-def upload_final_video(local_video_path, project_id=None, filename="final_video.mp4"):
+def find_missing_gcs_objects(gcs_uris):
+    """
+    Check that GCS objects exist, probing them concurrently
+    
+    Args:
+        gcs_uris: List of full GCS URIs (gs://bucket/path)
+    
+    Returns:
+        list: URIs that do not exist, in input order (empty if all exist)
+    """
+    def _exists(gcs_uri):
+        bucket_name, _, blob_path = gcs_uri.removeprefix("gs://").partition("/")
+        return _get_bucket(bucket_name).blob(blob_path).exists()
+    
+    if not gcs_uris:
+        return []
+    
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(MAX_DOWNLOAD_WORKERS, len(gcs_uris))) as executor:
+        found = list(executor.map(_exists, gcs_uris))
+    
+    return [gcs_uri for gcs_uri, exists in zip(gcs_uris, found) if not exists]
+
+
+def upload_final_video(local_video_path, project_id=None, filename="final_video.mp4", gcs_paths=None):
     """
     Upload final merged video to GCS
     
@@ -197,17 +340,19 @@ def upload_final_video(local_video_path, project_id=None, filename="final_video.
         local_video_path: Path to local merged video
         project_id: Optional custom project ID
         filename: Name for the final video file
+        gcs_paths: Optional paths dict from get_gcs_paths() (see upload_reference_images)
     
     Returns:
         str: GCS URI of uploaded final video
     """
-    gcs_paths = get_gcs_paths(project_id)
+    if gcs_paths is None:
+        gcs_paths = get_gcs_paths(project_id)
     gcs_path = f"{gcs_paths['final']}/{filename}"
     
-    print(f"\n📤 Uploading final video...")
+    logger.info("\n📤 Uploading final video...")
     gcs_uri = upload_to_gcs(local_video_path, gcs_path, content_type='video/mp4')
     
-    print(f"✅ Final video uploaded: {gcs_uri}")
+    logger.info("✅ Final video uploaded: %s", gcs_uri)
     
     return gcs_uri
 
@@ -225,19 +370,20 @@ def cleanup_temp_files(local_folder=None):
     if not os.path.exists(local_folder):
         return
     
-    print(f"\n🧹 Cleaning up temporary files in {local_folder}...")
+    logger.info("\n🧹 Cleaning up temporary files in %s...", local_folder)
     
+    # scandir entries carry their file type, so no extra stat per file
     deleted_count = 0
-    for file in os.listdir(local_folder):
-        file_path = os.path.join(local_folder, file)
-        try:
-            if os.path.isfile(file_path):
-                os.unlink(file_path)
-                deleted_count += 1
-        except Exception as e:
-            print(f"⚠️ Could not delete {file_path}: {e}")
-    
-    print(f"✅ Cleaned up {deleted_count} temporary file(s)")
+    with os.scandir(local_folder) as entries:
+        for entry in entries:
+            try:
+                if entry.is_file():
+                    os.unlink(entry.path)
+                    deleted_count += 1
+            except Exception as e:
+                logger.warning("⚠️ Could not delete %s: %s", entry.path, e)
+    
+    logger.info("✅ Cleaned up %d temporary file(s)", deleted_count)
 
 
 def list_gcs_files(gcs_folder_path):
@@ -247,25 +393,29 @@ def list_gcs_files(gcs_folder_path):
     Args:
         gcs_folder_path: GCS folder path (without gs:// prefix)
     
-    Returns:
-        list: List of blob names
+    Yields:
+        str: Blob names, page by page (wrap in list() if you need a list)
     """
     try:
-        bucket = storage_client.bucket(config.GCS_BUCKET_NAME)
-        blobs = bucket.list_blobs(prefix=gcs_folder_path)
-        
-        files = [blob.name for blob in blobs if not blob.name.endswith('/')]
+        # Only names are needed, so skip the rest of each object's metadata
+        blobs = _BUCKET.list_blobs(
+            prefix=gcs_folder_path,
+            fields="items(name),nextPageToken",
+            page_size=1000
+        )
         
-        return files
+        for blob in blobs:
+            if not blob.name.endswith('/'):
+                yield blob.name
         
     except Exception as e:
-        print(f"❌ Error listing files: {e}")
-        return []
+        logger.error("❌ Error listing files: %s", e)
 
 
 if __name__ == "__main__":
     # Test GCS utilities
     print("Testing GCS utilities...")
+    config.bootstrap()
     config.validate_config()
     
     # Test path generation
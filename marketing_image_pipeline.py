@@ -6,25 +6,119 @@ Generates 3 different marketing creative variations from a single LLM planning r
 import os
 import time
 import re
+import random
+import asyncio
+import threading
 import google.generativeai as genai
-from PIL import Image
 from io import BytesIO
+from google.api_core.exceptions import ResourceExhausted
 from datetime import datetime
 import cloudinary.uploader
 import prompt_instruction_templates
-import concurrent.futures
 
 
-def plan_marketing_prompts(user_product_type, user_marketing_copy, user_images, unique_id):
-    """
-    Generates 3 marketing prompts using the Planner LLM.
-    This is a multimodal call that includes the user's images for visual analysis.
-    
-    Returns:
-        str: The full planned prompt text containing all 3 variations
-    """
-    print(f"--- Step 1: Planning Marketing Prompts (ID: {unique_id}) ---")
+# Pattern to match: prompt 1: "..." or prompt 2: "..." (handles multiline)
+_PROMPT_RE = re.compile(
+    r'prompt\s+(\d+):\s*["\'](.+?)["\'](?=\s*(?:prompt\s+\d+:|$))',
+    re.DOTALL | re.IGNORECASE
+)
+
+# Shared model handles; the SDK creates its API client lazily on first use,
+# so these are safe to build before genai.configure() runs in app.py
+_PLANNER = genai.GenerativeModel('gemini-2.5-pro')
+_EXECUTOR = genai.GenerativeModel('gemini-2.5-flash-image')
+
+# The async gRPC client a model creates is bound to the event loop it was
+# first used on, so all pipeline runs share one long-lived background loop
+_EVENT_LOOP = None
+_EVENT_LOOP_LOCK = threading.Lock()
+
+
+def _run_on_pipeline_loop(coro):
+    """Runs a coroutine on the shared pipeline loop and blocks for its result"""
+    global _EVENT_LOOP
+    with _EVENT_LOOP_LOCK:
+        if _EVENT_LOOP is None:
+            _EVENT_LOOP = asyncio.new_event_loop()
+            threading.Thread(
+                target=_EVENT_LOOP.run_forever,
+                name="marketing-pipeline-loop",
+                daemon=True
+            ).start()
+    return asyncio.run_coroutine_threadsafe(coro, _EVENT_LOOP).result()
+
+# Client-side pacing for Gemini calls: requests only wait once the burst
+# budget is spent, and 429s back off exponentially (1s, 2s, 4s, ... max 30s)
+GEMINI_REQUESTS_PER_SECOND = 10
+GEMINI_BURST = 10
+GEMINI_MAX_RETRIES = 5
+GEMINI_BACKOFF_MAX = 30
+
+
+class _TokenBucket:
+    """Thread-safe token bucket pacing the Gemini calls"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self):
+        """Takes one token and returns how long the caller must wait for it"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    async def aacquire(self):
+        wait = self._reserve()
+        if wait:
+            await asyncio.sleep(wait)
+
+
+_RATE_LIMITER = _TokenBucket(GEMINI_REQUESTS_PER_SECOND, GEMINI_BURST)
+
+
+def _backoff_delay(attempt):
+    """Exponential backoff with up to 1s of jitter"""
+    return min(2 ** attempt, GEMINI_BACKOFF_MAX) + random.uniform(0, 1)
+
+
+async def _agenerate_content(model, contents):
+    """generate_content_async behind the rate limiter, retrying on 429 (ResourceExhausted)"""
+    for attempt in range(GEMINI_MAX_RETRIES):
+        await _RATE_LIMITER.aacquire()
+        try:
+            return await model.generate_content_async(contents)
+        except ResourceExhausted:
+            if attempt == GEMINI_MAX_RETRIES - 1:
+                raise
+            delay = _backoff_delay(attempt)
+            print(f"⚠ Gemini rate limited (429), retrying in {delay:.1f}s...")
+            await asyncio.sleep(delay)
+
+
+def _sniff_mime(image_bytes):
+    """Detects the image MIME type from its magic bytes (no decode, no copy)"""
+    header = memoryview(image_bytes)[:12]
+    if header[:3] == b'\xff\xd8\xff':
+        return 'image/jpeg'
+    if header[:8] == b'\x89PNG\r\n\x1a\n':
+        return 'image/png'
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'image/webp'
+    if header[:6] in (b'GIF87a', b'GIF89a'):
+        return 'image/gif'
+    print("⚠ Unknown image format, defaulting to image/png")
+    return 'image/png'
+
 
+def _build_planner_contents(user_product_type, user_marketing_copy, user_images, unique_id):
+    """Builds the multimodal planner request: text prompt followed by the user's images"""
     # Build the text portion of the prompt
     prompt_lines = [
         f"Request-ID: {unique_id}",
@@ -40,21 +134,37 @@ def plan_marketing_prompts(user_product_type, user_marketing_copy, user_images,
     text_prompt = "\n".join(prompt_lines)
 
     # Combine text and images
-    contents = [text_prompt] + user_images
+    return [text_prompt] + user_images
+
+
+def _log_cached_tokens(role, response, unique_id):
+    """Reports cached-token usage so accidental cache hits are visible in logs"""
+    cached_tokens = response.usage_metadata.cached_content_token_count
+    print(f"{role} ({unique_id}) - Cached Tokens: {cached_tokens}")
+    if cached_tokens > 0:
+        print(f"WARNING: {role} ({unique_id}) - CACHE HIT DETECTED!")
+
+
+async def aplan_marketing_prompts(user_product_type, user_marketing_copy, user_images, unique_id):
+    """
+    Generates 3 marketing prompts using the Planner LLM.
+    This is a multimodal call that includes the user's images for visual analysis.
+    
+    Returns:
+        str: The full planned prompt text containing all 3 variations
+    """
+    print(f"--- Step 1: Planning Marketing Prompts (ID: {unique_id}) ---")
+
+    contents = _build_planner_contents(user_product_type, user_marketing_copy, user_images, unique_id)
 
     try:
-        planner_model = genai.GenerativeModel('gemini-2.5-pro')
-        response = planner_model.generate_content(contents)
+        response = await _agenerate_content(_PLANNER, contents)
 
-        cached_tokens = response.usage_metadata.cached_content_token_count
-        print(f"Planner ({unique_id}) - Cached Tokens: {cached_tokens}")
-        if cached_tokens > 0:
-            print(f"WARNING: Planner ({unique_id}) - CACHE HIT DETECTED!")
+        _log_cached_tokens("Planner", response, unique_id)
 
         planned_prompt_text = response.text.strip()
         print(f"✓ Successfully planned marketing prompts for '{unique_id}'.")
         
-        time.sleep(1)
         return planned_prompt_text
         
     except Exception as e:
@@ -62,6 +172,18 @@ def plan_marketing_prompts(user_product_type, user_marketing_copy, user_images,
         raise
 
 
+def plan_marketing_prompts(user_product_type, user_marketing_copy, user_images, unique_id):
+    """
+    Blocking entry point for aplan_marketing_prompts (runs on the pipeline loop).
+    
+    Returns:
+        str: The full planned prompt text containing all 3 variations
+    """
+    return _run_on_pipeline_loop(
+        aplan_marketing_prompts(user_product_type, user_marketing_copy, user_images, unique_id)
+    )
+
+
 def parse_marketing_prompts(planned_prompt_text):
     """
     Parses the LLM response to extract three marketing prompts.
@@ -72,10 +194,7 @@ def parse_marketing_prompts(planned_prompt_text):
     """
     print("--- Parsing Marketing Prompts ---")
     
-    # Pattern to match: prompt 1: "..." or prompt 2: "..." (handles multiline)
-    pattern = r'prompt\s+(\d+):\s*["\'](.+?)["\'](?=\s*(?:prompt\s+\d+:|$))'
-    
-    matches = re.findall(pattern, planned_prompt_text, re.DOTALL | re.IGNORECASE)
+    matches = _PROMPT_RE.findall(planned_prompt_text)
     
     if len(matches) == 3:
         prompts = [match[1].strip() for match in matches]
@@ -89,7 +208,7 @@ def parse_marketing_prompts(planned_prompt_text):
         raise ValueError(f"Failed to parse 3 prompts. Found {len(matches)} prompts instead.")
 
 
-def execute_image_generation(prompt_text, user_images, unique_id):
+async def aexecute_image_generation(prompt_text, user_images, unique_id):
     """
     Uses the image generation model to create a single marketing image.
     
@@ -99,33 +218,14 @@ def execute_image_generation(prompt_text, user_images, unique_id):
     print(f"--- Executing Image Generation (ID: {unique_id}) ---")
     
     try:
-        model = genai.GenerativeModel('gemini-2.5-flash-image')
-        
         prompt_with_id = f"{prompt_text}\n\nExecution-ID: {unique_id}"
         contents = [prompt_with_id] + user_images
         
-        response = model.generate_content(contents)
+        response = await _agenerate_content(_EXECUTOR, contents)
 
-        cached_tokens = response.usage_metadata.cached_content_token_count
-        print(f"Executor ({unique_id}) - Cached Tokens: {cached_tokens}")
-        if cached_tokens > 0:
-            print(f"WARNING: Executor ({unique_id}) - CACHE HIT DETECTED!")
+        _log_cached_tokens("Executor", response, unique_id)
         
-        generated_image_bytes = None
-        for part in response.candidates[0].content.parts:
-            if part.inline_data:
-                image_stream = BytesIO(part.inline_data.data)
-                generated_image_bytes = image_stream.getvalue()
-                print(f"✓ Successfully extracted generated image bytes for {unique_id}.")
-                break
-
-        if generated_image_bytes:
-            time.sleep(1)
-            return generated_image_bytes
-        else:
-            print("--- FAILED TO FIND IMAGE DATA IN RESPONSE ---")
-            print(f"Full Gemini Response: {response}")
-            raise ValueError("No inline_data found in any part of the Gemini response.")
+        return _extract_image_bytes(response, unique_id)
 
     except Exception as e:
         print(f"Error during image generation (ID: {unique_id}): {e}")
@@ -134,9 +234,51 @@ def execute_image_generation(prompt_text, user_images, unique_id):
         raise
 
 
-def generate_single_marketing_variation(prompt_text, variation_num, user_images, product_type, timestamp_str, pipeline_id):
+def execute_image_generation(prompt_text, user_images, unique_id):
+    """
+    Blocking entry point for aexecute_image_generation (runs on the pipeline loop).
+    
+    Returns:
+        bytes: Generated image bytes
+    """
+    return _run_on_pipeline_loop(aexecute_image_generation(prompt_text, user_images, unique_id))
+
+
+def _extract_image_bytes(response, unique_id):
+    """Returns the first inline image in the response, or raises ValueError"""
+    for part in response.candidates[0].content.parts:
+        if part.inline_data:
+            print(f"✓ Successfully extracted generated image bytes for {unique_id}.")
+            # Already immutable bytes; hand it on without copying
+            return part.inline_data.data
+
+    print("--- FAILED TO FIND IMAGE DATA IN RESPONSE ---")
+    print(f"Full Gemini Response: {response}")
+    raise ValueError("No inline_data found in any part of the Gemini response.")
+
+
+async def _aupload_variation(img_bytes, variation_num, product_type, timestamp_str):
+    """Uploads one variation to Cloudinary (sync SDK, so in a worker thread)"""
+    product_slug = product_type.replace(" ", "-").lower()
+    public_id = f"{product_slug}_marketing_var{variation_num}_{timestamp_str}"
+    
+    upload_result = await asyncio.to_thread(
+        cloudinary.uploader.upload,
+        img_bytes, 
+        folder="test_version_2/outputs/marketing", 
+        public_id=public_id
+    )
+    
+    url = upload_result['secure_url']
+    print(f"  ✓ Variation {variation_num} uploaded successfully")
+    print(f"    URL: {url}")
+    return url
+
+
+async def generate_single_marketing_variation_async(prompt_text, variation_num, user_images, product_type, timestamp_str, pipeline_id):
     """
     Helper function to generate a single marketing variation.
+    Cloudinary has no async client, so the upload runs in a worker thread.
     
     Returns:
         str: Cloudinary URL of the uploaded image
@@ -146,28 +288,117 @@ def generate_single_marketing_variation(prompt_text, variation_num, user_images,
     
     try:
         # Generate image
-        img_bytes = execute_image_generation(prompt_text, user_images, unique_id=variation_id)
+        img_bytes = await aexecute_image_generation(prompt_text, user_images, unique_id=variation_id)
         
         # Upload to Cloudinary
-        product_slug = product_type.replace(" ", "-").lower()
-        public_id = f"{product_slug}_marketing_var{variation_num}_{timestamp_str}"
-        
-        upload_result = cloudinary.uploader.upload(
-            BytesIO(img_bytes), 
-            folder="test_version_2/outputs/marketing", 
-            public_id=public_id
-        )
-        
-        url = upload_result['secure_url']
-        print(f"  ✓ Variation {variation_num} uploaded successfully")
-        print(f"    URL: {url}")
-        return url
+        return await _aupload_variation(img_bytes, variation_num, product_type, timestamp_str)
         
     except Exception as e:
         print(f"  ✗ Variation {variation_num} FAILED: {e}")
         raise
 
 
+def generate_single_marketing_variation(prompt_text, variation_num, user_images, product_type, timestamp_str, pipeline_id):
+    """
+    Blocking entry point for generate_single_marketing_variation_async.
+    
+    Returns:
+        str: Cloudinary URL of the uploaded image
+    """
+    return _run_on_pipeline_loop(generate_single_marketing_variation_async(
+        prompt_text, variation_num, user_images, product_type, timestamp_str, pipeline_id
+    ))
+
+
+async def _aupload_user_images(user_images):
+    """
+    Uploads each inline image part to the Gemini Files API once.
+    
+    Returns:
+        list: File handles, usable in place of the inline parts
+    """
+    return list(await asyncio.gather(*[
+        asyncio.to_thread(genai.upload_file, BytesIO(img["data"]), mime_type=img["mime_type"])
+        for img in user_images
+    ]))
+
+
+async def _adelete_user_images(file_refs):
+    """Best-effort removal of uploaded user images (they expire after 48h anyway)"""
+    results = await asyncio.gather(
+        *[asyncio.to_thread(genai.delete_file, ref.name) for ref in file_refs],
+        return_exceptions=True
+    )
+    failed = sum(isinstance(r, Exception) for r in results)
+    if failed:
+        print(f"⚠ Could not delete {failed} uploaded input image(s) from the Files API")
+
+
+async def _run_marketing_pipeline(product_type, marketing_copy, user_images, timestamp_str, pipeline_id):
+    """
+    Uploads the user images to the Files API once, then runs the pipeline
+    with file references so the planner and executors only send URIs.
+    Falls back to inline image parts if the upload fails.
+    
+    Returns:
+        tuple: (planned_prompt_text, marketing_prompts, generated_urls)
+    """
+    try:
+        file_refs = await _aupload_user_images(user_images)
+        print(f"✓ Uploaded {len(file_refs)} input image(s) to the Gemini Files API")
+    except Exception as e:
+        print(f"⚠ Files API upload failed, sending images inline: {e}")
+        file_refs = None
+    
+    try:
+        return await _run_marketing_steps(
+            product_type, marketing_copy, file_refs or user_images, timestamp_str, pipeline_id
+        )
+    finally:
+        if file_refs:
+            await _adelete_user_images(file_refs)
+
+
+async def _run_marketing_steps(product_type, marketing_copy, user_images, timestamp_str, pipeline_id):
+    """
+    Planning + concurrent generation on a single event loop.
+    
+    Returns:
+        tuple: (planned_prompt_text, marketing_prompts, generated_urls)
+    """
+    # === STEP 1: PLANNING ===
+    planned_prompt_text = await aplan_marketing_prompts(
+        user_product_type=product_type,
+        user_marketing_copy=marketing_copy,
+        user_images=user_images,
+        unique_id=pipeline_id
+    )
+    
+    # === STEP 2: PARSING ===
+    marketing_prompts = parse_marketing_prompts(planned_prompt_text)
+    
+    if len(marketing_prompts) != 3:
+        raise ValueError(f"Expected 3 prompts, got {len(marketing_prompts)}")
+    
+    # === STEP 3: CONCURRENT IMAGE GENERATION ===
+    print(f"\n--- Generating 3 Marketing Images Concurrently ---")
+    
+    # gather keeps results in variation order (1, 2, 3)
+    generated_urls = await asyncio.gather(*[
+        generate_single_marketing_variation_async(
+            marketing_prompts[i],
+            i + 1,
+            user_images,
+            product_type,
+            timestamp_str,
+            pipeline_id
+        )
+        for i in range(3)
+    ])
+    
+    return planned_prompt_text, marketing_prompts, list(generated_urls)
+
+
 def generate_marketing_images(product_type, marketing_copy, user_images_bytes_list):
     """
     Main entry point for marketing image generation pipeline.
@@ -197,47 +428,18 @@ def generate_marketing_images(product_type, marketing_copy, user_images_bytes_li
     print(f"{'='*80}\n")
     
     try:
-        # Convert bytes to PIL Images
-        user_images = [Image.open(BytesIO(img_bytes)) for img_bytes in user_images_bytes_list]
+        # Pass raw bytes as inline parts; Gemini decodes them, so no PIL round trip
+        user_images = [
+            {"mime_type": _sniff_mime(img_bytes), "data": img_bytes}
+            for img_bytes in user_images_bytes_list
+        ]
         print(f"✓ Loaded {len(user_images)} input image(s)")
         
-        # === STEP 1: PLANNING ===
-        planned_prompt_text = plan_marketing_prompts(
-            user_product_type=product_type,
-            user_marketing_copy=marketing_copy,
-            user_images=user_images,
-            unique_id=pipeline_id
+        # === STEPS 1-3: PLANNING, PARSING, CONCURRENT IMAGE GENERATION ===
+        planned_prompt_text, marketing_prompts, generated_urls = _run_on_pipeline_loop(
+            _run_marketing_pipeline(product_type, marketing_copy, user_images, timestamp_str, pipeline_id)
         )
         
-        # === STEP 2: PARSING ===
-        marketing_prompts = parse_marketing_prompts(planned_prompt_text)
-        
-        if len(marketing_prompts) != 3:
-            raise ValueError(f"Expected 3 prompts, got {len(marketing_prompts)}")
-        
-        # === STEP 3: CONCURRENT IMAGE GENERATION ===
-        print(f"\n--- Generating 3 Marketing Images Concurrently ---")
-        
-        generated_urls = []
-        
-        with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
-            futures = [
-                executor.submit(
-                    generate_single_marketing_variation,
-                    marketing_prompts[i],
-                    i + 1,
-                    user_images,
-                    product_type,
-                    timestamp_str,
-                    pipeline_id
-                )
-                for i in range(3)
-            ]
-            
-            for future in concurrent.futures.as_completed(futures):
-                url = future.result()
-                generated_urls.append(url)
-        
         # === STEP 4: SAVE PLANNED PROMPT TO LOG ===
         try:
             with open("generated_prompts_log.txt", "w", encoding="utf-8") as f:
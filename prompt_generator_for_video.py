@@ -3,21 +3,62 @@ Generate video prompts using Gemini 2.5 Pro
 Creates segment-wise prompts with timestamps for Veo video generation
 """
 
-import json
 import os
+import logging
+import math
+import time
+import random
+import asyncio
+import functools
+import concurrent.futures
+import importlib.util
+import httpx
+import orjson
 from datetime import datetime
 from google import genai
-from google.genai import types
+from google.genai import types, errors
 import config
 
 
+# Progress logging; per-image and per-segment detail is DEBUG
+logger = config.get_logger(__name__)
+
+# Pooled keep-alive connections for the Gemini client, shared by all threads;
+# HTTP/2 multiplexes concurrent requests over one TLS connection when the
+# optional h2 package is installed
+_HTTP_CLIENT_ARGS = {
+    "http2": importlib.util.find_spec("h2") is not None,
+    "limits": httpx.Limits(max_connections=64, max_keepalive_connections=32),
+}
+
 # Initialize Gemini client
 client = genai.Client(
     vertexai=True,
     project=config.GOOGLE_CLOUD_PROJECT,
-    location=config.GOOGLE_CLOUD_LOCATION
+    location=config.GOOGLE_CLOUD_LOCATION,
+    http_options=types.HttpOptions(
+        client_args=_HTTP_CLIENT_ARGS,
+        async_client_args=_HTTP_CLIENT_ARGS
+    )
 )
 
+# Transient Gemini failures (429, 5xx, dropped connections) are retried with
+# exponential backoff: 1s, 2s, ... plus up to 1s jitter
+GEMINI_MAX_ATTEMPTS = 3
+GEMINI_BACKOFF_BASE = 1
+
+# Instruction template contents keyed by (path, mtime); editing the file
+# changes the mtime, so a stale copy is never served
+_TEMPLATE_CACHE = {}
+
+# MIME types for reference image extensions (anything else is sent as PNG)
+_IMAGE_MIME_TYPES = {
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".png": "image/png",
+    ".webp": "image/webp",
+}
+
 
 def load_instruction_template():
     """
@@ -26,15 +67,262 @@ def load_instruction_template():
     Returns:
         str: Template content
     """
-    if not os.path.exists(config.VEO_INSTRUCTION_TEMPLATE):
-        raise FileNotFoundError(
-            f"Instruction template not found: {config.VEO_INSTRUCTION_TEMPLATE}"
-        )
+    path = config.VEO_INSTRUCTION_TEMPLATE
+    try:
+        key = (path, os.stat(path).st_mtime)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Instruction template not found: {path}") from None
+    
+    template = _TEMPLATE_CACHE.get(key)
+    if template is None:
+        with open(path, 'r', encoding='utf-8') as f:
+            template = f.read()
+        _TEMPLATE_CACHE.clear()  # Only the current version is worth keeping
+        _TEMPLATE_CACHE[key] = template
+    
+    return template
+
+
+def _dumps_pretty(obj):
+    """Pretty-printed (2-space indent) UTF-8 JSON bytes, matching json.dumps(indent=2, ensure_ascii=False)"""
+    return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+
+
+def _extract_json_obj(text):
+    """
+    Slice out the first complete top-level {...} object in text
+    
+    Single O(n) pass tracking brace depth; braces inside JSON strings
+    (including escaped quotes) are ignored. Drops code fences and any
+    preamble/epilogue around the object.
+    
+    Returns:
+        str: The object text, or None if there is no complete object
+    """
+    start = text.find('{')
+    if start < 0:
+        return None
+    
+    depth = 0
+    in_string = False
+    escaped = False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == '\\':
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == '{':
+            depth += 1
+        elif ch == '}':
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    
+    return None
+
+
+def _parse_prompts_json(response_text):
+    """
+    Parse Gemini's JSON output, salvaging slightly malformed responses
+    
+    Strict orjson parsing is tried first. On failure the outermost {...}
+    object is cut out (dropping fences or trailing text) and parsed
+    strictly again, and only then is the (much slower) json5 parser used,
+    which tolerates trailing commas, comments and unquoted keys. That saves
+    re-running the whole generation.
     
-    with open(config.VEO_INSTRUCTION_TEMPLATE, 'r', encoding='utf-8') as f:
+    Returns:
+        dict: Parsed prompts JSON
+    """
+    try:
+        return orjson.loads(response_text)
+    except orjson.JSONDecodeError as strict_error:
+        json_text = _extract_json_obj(response_text)
+        if json_text is None:
+            raise
+        
+        try:
+            prompts_json = orjson.loads(json_text)
+            logger.warning("⚠️ Gemini wrapped its JSON in extra text; parsed the embedded object")
+            return prompts_json
+        except orjson.JSONDecodeError:
+            pass
+        
+        try:
+            import json5
+        except ImportError:
+            raise strict_error from None
+        
+        try:
+            prompts_json = json5.loads(json_text)
+        except ValueError:
+            raise strict_error from None
+        
+        logger.warning("⚠️ Gemini returned non-strict JSON (%s); parsed with json5", strict_error)
+        return prompts_json
+
+
+def _read_file(path):
+    """
+    Read a whole file as bytes
+    
+    A plain read() is deliberate: it sizes the buffer from fstat and copies
+    once from the page cache. types.Part.from_bytes needs real bytes, so an
+    mmap/memoryview would have to be copied into bytes anyway, adding page
+    faults on top of the same copy.
+    """
+    with open(path, 'rb') as f:
         return f.read()
 
 
+def _read_reference_images(image_paths):
+    """
+    Read reference images concurrently
+    
+    Args:
+        image_paths: Local image paths (all must exist)
+    
+    Returns:
+        list: File contents, in the same order as image_paths
+    """
+    if not image_paths:
+        return []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(image_paths)) as executor:
+        return list(executor.map(_read_file, image_paths))
+
+
+@functools.lru_cache(maxsize=32)
+def _build_system_prompt(template_mtime, total_duration, segment_duration, max_images):
+    """
+    Format the instruction template for one duration/image configuration
+    
+    template_mtime is only part of the cache key: editing the template
+    yields a new key, so the formatted prompt is rebuilt.
+    """
+    return load_instruction_template().format(
+        total_duration=total_duration,
+        segment_duration=segment_duration,
+        max_images=max_images
+    )
+
+
+@functools.lru_cache(maxsize=16)
+def _prompts_response_schema(segment_count):
+    """
+    Response schema matching the instruction template's output contract:
+    segment_1..segment_N, each with 2-3 timestamp / timestamp_prompt pairs
+    
+    Constrained decoding then guarantees parseable, complete JSON.
+    """
+    timestamp_keys = [
+        key
+        for beat in range(1, 4)
+        for key in (f"timestamp{beat}", f"timestamp{beat}_prompt")
+    ]
+    segment_schema = types.Schema(
+        type=types.Type.OBJECT,
+        properties={key: types.Schema(type=types.Type.STRING) for key in timestamp_keys},
+        required=timestamp_keys[:4],  # timestamp3 is optional
+        property_ordering=timestamp_keys
+    )
+    
+    segment_keys = [f"segment_{idx}" for idx in range(1, segment_count + 1)]
+    return types.Schema(
+        type=types.Type.OBJECT,
+        properties={key: segment_schema for key in segment_keys},
+        required=segment_keys,
+        property_ordering=segment_keys
+    )
+
+
+def _resolve_system_prompt(total_duration, segment_duration):
+    """Formatted system prompt for the current template version (cached)"""
+    try:
+        template_mtime = os.stat(config.VEO_INSTRUCTION_TEMPLATE).st_mtime
+    except FileNotFoundError:
+        template_mtime = None  # load_instruction_template raises the proper error
+    
+    return _build_system_prompt(
+        template_mtime, total_duration, segment_duration, config.MAX_IMAGES
+    )
+
+
+def _reference_image_parts(reference_image_paths):
+    """
+    Build Gemini parts for up to MAX_IMAGES existing reference images
+    
+    Returns:
+        list: types.Part objects, in the order given
+    """
+    parts = []
+    if not reference_image_paths:
+        return parts
+    
+    # Read in parallel, attach in order
+    image_paths = [p for p in reference_image_paths[:config.MAX_IMAGES] if os.path.exists(p)]
+    
+    for img_path, image_data in zip(image_paths, _read_reference_images(image_paths)):
+        mime_type = _IMAGE_MIME_TYPES.get(os.path.splitext(img_path)[1].lower(), "image/png")
+        
+        # Use from_bytes (your original working method)
+        parts.append(
+            types.Part.from_bytes(
+                data=image_data,
+                mime_type=mime_type
+            )
+        )
+        logger.debug("   ✓ Added reference image: %s", os.path.basename(img_path))
+    
+    return parts
+
+
+def _is_transient(error):
+    """True for errors worth retrying: server errors, rate limits, network drops"""
+    if isinstance(error, errors.ServerError) or isinstance(error, httpx.TransportError):
+        return True
+    return isinstance(error, errors.ClientError) and error.code == 429
+
+
+def _request_prompts_json(content_parts, system_prompt, response_schema=None):
+    """
+    Call the text model in JSON mode (optionally schema-constrained) and parse the response
+    
+    Only the RPC is retried; content_parts (already-read images) are reused
+    as-is, so a retry never touches the disk again.
+    """
+    generate_config = types.GenerateContentConfig(
+        system_instruction=system_prompt,
+        temperature=1,
+        response_mime_type="application/json",
+        response_schema=response_schema
+    )
+    
+    for attempt in range(1, GEMINI_MAX_ATTEMPTS + 1):
+        try:
+            # Generate content (your original pattern)
+            response = client.models.generate_content(
+                model=config.TEXT_MODEL,
+                contents=content_parts,  # Pass list directly
+                config=generate_config
+            )
+            break
+        except Exception as e:
+            if attempt == GEMINI_MAX_ATTEMPTS or not _is_transient(e):
+                raise
+            delay = GEMINI_BACKOFF_BASE * 2 ** (attempt - 1) + random.uniform(0, 1)
+            logger.warning("⚠️ Gemini request failed (%s); retry %d/%d in %.1fs", e, attempt, GEMINI_MAX_ATTEMPTS - 1, delay)
+            time.sleep(delay)
+    
+    # Parse JSON response
+    return _parse_prompts_json(response.text)
+
+
 def generate_prompts_with_gemini(
     user_requirements,
     reference_image_paths=None,
@@ -59,15 +347,8 @@ def generate_prompts_with_gemini(
     if segment_duration is None:
         segment_duration = config.DEFAULT_SEGMENT_DURATION
     
-    # Load instruction template
-    instruction_template = load_instruction_template()
-    
-    # Build the prompt for Gemini
-    system_prompt = instruction_template.format(
-        total_duration=total_duration,
-        segment_duration=segment_duration,
-        max_images=config.MAX_IMAGES
-    )
+    # Build the prompt for Gemini (formatted once per template version and durations)
+    system_prompt = _resolve_system_prompt(total_duration, segment_duration)
     
     user_prompt = f"""User Requirements/Product specification:
 {user_requirements}
@@ -77,55 +358,104 @@ Segment Duration: {segment_duration} seconds each
 Keep the style professional and commercial, suitable for e-commerce.
 Please generate detailed Veo prompts for each segment following the instruction template."""
     
-    print(f"\n🤖 Generating prompts with {config.TEXT_MODEL}...")
-    print(f"   Total duration: {total_duration}s")
-    print(f"   Segment duration: {segment_duration}s")
-    print(f"   Reference images: {len(reference_image_paths) if reference_image_paths else 0}")
+    logger.info("\n🤖 Generating prompts with %s...", config.TEXT_MODEL)
+    logger.info("   Total duration: %ss", total_duration)
+    logger.info("   Segment duration: %ss", segment_duration)
+    logger.info("   Reference images: %d", len(reference_image_paths) if reference_image_paths else 0)
     
     try:
         # Prepare content parts (your original pattern)
         content_parts = [user_prompt]  # String is fine for text
         
         # Add reference images if provided
-        if reference_image_paths:
-            for img_path in reference_image_paths[:config.MAX_IMAGES]:
-                if os.path.exists(img_path):
-                    with open(img_path, 'rb') as f:
-                        image_data = f.read()
-                    
-                    # Determine MIME type
-                    mime_type = "image/jpeg" if img_path.lower().endswith(('.jpg', '.jpeg')) else "image/png"
-                    
-                    # Use from_bytes (your original working method)
-                    content_parts.append(
-                        types.Part.from_bytes(
-                            data=image_data,
-                            mime_type=mime_type
-                        )
-                    )
-                    print(f"   ✓ Added reference image: {os.path.basename(img_path)}")
+        content_parts.extend(_reference_image_parts(reference_image_paths))
         
-        # Generate content (your original pattern)
-        response = client.models.generate_content(
-            model=config.TEXT_MODEL,
-            contents=content_parts,  # Pass list directly
-            config=types.GenerateContentConfig(
-                system_instruction=system_prompt,
-                temperature=1,
-                response_mime_type="application/json"
-            )
+        segment_count = math.ceil(total_duration / segment_duration)
+        prompts_json = _request_prompts_json(
+            content_parts, system_prompt, _prompts_response_schema(segment_count)
         )
         
-        # Parse JSON response
-        response_text = response.text
-        prompts_json = json.loads(response_text)
-        
-        print(f"✅ Prompts generated successfully")
+        logger.info("✅ Prompts generated successfully")
         
         return prompts_json
         
     except Exception as e:
-        print(f"❌ Error generating prompts: {e}")
+        logger.error("❌ Error generating prompts: %s", e)
+        raise
+
+
+def generate_prompts_batch(
+    requirements_list,
+    reference_image_paths=None,
+    total_duration=None,
+    segment_duration=None
+):
+    """
+    Generate video prompts for several independent requirements in one Gemini call
+    
+    All items share the reference images and durations. Gemini is asked for
+    one object per item ({"item_1": {...}, "item_2": {...}}), each with the
+    same structure generate_prompts_with_gemini returns.
+    
+    Args:
+        requirements_list: List of user requirement strings
+        reference_image_paths: List of local paths to reference images (max 3)
+        total_duration: Total video duration in seconds
+        segment_duration: Duration of each segment in seconds
+    
+    Returns:
+        list: One prompts dict per requirement, in input order
+    """
+    if not requirements_list:
+        return []
+    
+    if total_duration is None:
+        total_duration = config.DEFAULT_TOTAL_DURATION
+    
+    if segment_duration is None:
+        segment_duration = config.DEFAULT_SEGMENT_DURATION
+    
+    item_count = len(requirements_list)
+    system_prompt = (
+        _resolve_system_prompt(total_duration, segment_duration)
+        + f"\n\nBATCH MODE: The user message contains {item_count} independent items. "
+        + f"Return a single JSON object with the keys \"item_1\" ... \"item_{item_count}\"; "
+        + "each value must be exactly the JSON object described above for that item alone."
+    )
+    
+    items = "\n\n".join(
+        f"Item {idx}:\n{requirements}"
+        for idx, requirements in enumerate(requirements_list, 1)
+    )
+    user_prompt = f"""User Requirements/Product specifications ({item_count} items):
+{items}
+
+Total Video Duration: {total_duration} seconds
+Segment Duration: {segment_duration} seconds each
+Keep the style professional and commercial, suitable for e-commerce.
+Please generate detailed Veo prompts for each segment of every item following the instruction template."""
+    
+    logger.info("\n🤖 Generating prompts for %d item(s) with %s...", item_count, config.TEXT_MODEL)
+    logger.info("   Total duration: %ss", total_duration)
+    logger.info("   Segment duration: %ss", segment_duration)
+    logger.info("   Reference images: %d", len(reference_image_paths) if reference_image_paths else 0)
+    
+    try:
+        content_parts = [user_prompt]
+        content_parts.extend(_reference_image_parts(reference_image_paths))
+        
+        batch_json = _request_prompts_json(content_parts, system_prompt)
+        
+        missing = [idx for idx in range(1, item_count + 1) if f"item_{idx}" not in batch_json]
+        if missing:
+            raise ValueError(f"Batch response is missing item(s): {missing}")
+        
+        logger.info("✅ Prompts generated successfully for %d item(s)", item_count)
+        
+        return [batch_json[f"item_{idx}"] for idx in range(1, item_count + 1)]
+        
+    except Exception as e:
+        logger.error("❌ Error generating batch prompts: %s", e)
         raise
 
 def extract_segment_prompts(prompts_json):
@@ -141,37 +471,44 @@ def extract_segment_prompts(prompts_json):
     """
     segments = []
     
-    # Iterate through segments
-    for segment_key in sorted(prompts_json.keys()):
-        if not segment_key.startswith('segment_'):
-            continue
-        
+    # ============================================================
+    # MODE SELECTION: Choose formatting based on config (once per call)
+    # ============================================================
+    format_mode = config.PROMPT_FORMAT_MODE
+    if format_mode not in ("full_json", "inline_timestamps"):
+        # Fallback to inline if invalid mode
+        logger.warning("⚠️ Unknown PROMPT_FORMAT_MODE: %s, using 'inline_timestamps'", format_mode)
+    
+    # (segment_number, key) pairs in numeric order (segment_2 before
+    # segment_10); each key is parsed once and the number reused below
+    numbered_keys = sorted(
+        (int(k[8:].split('_', 1)[0]), k)
+        for k in prompts_json
+        if k.startswith('segment_')
+    )
+    
+    for segment_number, segment_key in numbered_keys:
         segment_data = prompts_json[segment_key]
-        segment_number = int(segment_key.split('_')[1])
         
-        # ============================================================
-        # MODE SELECTION: Choose formatting based on config
-        # ============================================================
+        # Scene beats (time range, prompt), computed once per segment
+        timestamp_pairs = _timestamp_pairs(segment_data)
         
-        if config.PROMPT_FORMAT_MODE == "full_json":
+        if format_mode == "full_json":
             # OPTION B: Send entire segment JSON as-is
             full_prompt = _format_full_json(segment_data, segment_number)
         
-        elif config.PROMPT_FORMAT_MODE == "inline_timestamps":
-            # OPTION C: Inline timestamps with temporal connectors
-            full_prompt = _format_inline_timestamps(segment_data, segment_number)
-        
         else:
-            # Fallback to inline if invalid mode
-            print(f"⚠️ Unknown PROMPT_FORMAT_MODE: {config.PROMPT_FORMAT_MODE}, using 'inline_timestamps'")
-            full_prompt = _format_inline_timestamps(segment_data, segment_number)
+            # OPTION C: Inline timestamps with temporal connectors
+            full_prompt = _format_inline_timestamps(segment_data, segment_number, timestamp_pairs)
         
         segments.append((segment_number, full_prompt))
         
         # Log segment info
-        char_count = len(full_prompt)
-        timestamp_count = len([k for k in segment_data.keys() if k.startswith('timestamp') and not k.endswith('_prompt')])
-        print(f"   Segment {segment_number}: {char_count} chars, {timestamp_count} scene beats, mode={config.PROMPT_FORMAT_MODE}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "   Segment %d: %d chars, %d scene beats, mode=%s",
+                segment_number, len(full_prompt), len(timestamp_pairs), format_mode
+            )
     
     return segments
 
@@ -190,14 +527,45 @@ def _format_full_json(segment_data, segment_number):
         str: JSON string of the entire segment
     """
     # Convert entire segment dict to pretty-printed JSON string
-    json_string = json.dumps(segment_data, indent=2, ensure_ascii=False)
+    # (orjson output is identical to json.dumps(indent=2, ensure_ascii=False))
+    json_string = _dumps_pretty(segment_data).decode('utf-8')
     
-    print(f"   → Mode B: Sending full JSON structure to Veo")
+    logger.debug("   → Mode B: Sending full JSON structure to Veo")
     
     return json_string
 
 
-def _format_inline_timestamps(segment_data, segment_number):
+def _timestamp_pairs(segment_data):
+    """
+    Pair each scene beat's time range with its prompt in one pass
+    
+    "timestamp1" holds the time range and "timestamp1_prompt" the action;
+    both land in the same [time_range, prompt] slot keyed by "timestamp1".
+    
+    Args:
+        segment_data: The segment dictionary from LLM
+    
+    Returns:
+        list: (time_range, prompt_text) tuples in key order; only beats that
+        have a time range key are included (prompt_text may be None)
+    """
+    pairs = {}
+    for key, value in segment_data.items():
+        if not key.startswith('timestamp'):
+            continue
+        if key.endswith('_prompt'):
+            pairs.setdefault(key[:-7], [None, None])[1] = value
+        else:
+            pairs.setdefault(key, [None, None])[0] = value
+    
+    return [
+        (time_range, prompt_text)
+        for time_range, prompt_text in (pairs[stem] for stem in sorted(pairs))
+        if time_range is not None
+    ]
+
+
+def _format_inline_timestamps(segment_data, segment_number, timestamp_pairs=None):
     """
     OPTION C: Format with inline timestamp markers
     Creates a temporal narrative: [00:00-00:03] action, followed by [00:03-00:06] action
@@ -205,100 +573,113 @@ def _format_inline_timestamps(segment_data, segment_number):
     Args:
         segment_data: The segment dictionary from LLM
         segment_number: Segment number for logging
+        timestamp_pairs: Optional _timestamp_pairs(segment_data) result
     
     Returns:
         str: Temporally-structured prompt string
     """
-    # Extract timestamps and prompts in order
-    timestamp_entries = []
+    if timestamp_pairs is None:
+        timestamp_pairs = _timestamp_pairs(segment_data)
     
-    # Get all timestamp keys (timestamp1, timestamp2, etc.)
-    timestamp_keys = sorted([k for k in segment_data.keys() if k.startswith('timestamp') and not k.endswith('_prompt')])
-    
-    for ts_key in timestamp_keys:
-        time_range = segment_data.get(ts_key, "")
-        prompt_key = f"{ts_key}_prompt"
-        prompt_text = segment_data.get(prompt_key, "")
-        
-        if prompt_text:
-            # Format: [00:00-00:03] Prompt text
-            timestamp_entries.append(f"[{time_range}] {prompt_text}")
+    # Format: [00:00-00:03] Prompt text
+    timestamp_entries = [
+        f"[{time_range}] {prompt_text}"
+        for time_range, prompt_text in timestamp_pairs
+        if prompt_text
+    ]
     
     # Join with natural temporal connectors
-    if len(timestamp_entries) > 1:
+    if timestamp_entries:
         full_prompt = ", followed by ".join(timestamp_entries)
-    elif len(timestamp_entries) == 1:
-        full_prompt = timestamp_entries[0]
     else:
         # Fallback: concatenate all prompt values
         full_prompt = ". ".join([v for k, v in segment_data.items() if 'prompt' in k.lower() and isinstance(v, str)])
     
-    print(f"   → Mode C: Inline timestamps with {len(timestamp_entries)} beats")
+    logger.debug("   → Mode C: Inline timestamps with %d beats", len(timestamp_entries))
     
     return full_prompt
 
-def save_prompts_to_file(prompts_json, filepath=None):
+def save_prompts_to_file(prompts_json, filepath=None, raw_json=None):
     """
     Save generated prompts to JSON file for review
     
     Args:
         prompts_json: Prompts JSON object
         filepath: Optional custom filepath
+        raw_json: Optional _dumps_pretty(prompts_json) bytes, to reuse an
+            existing serialization
     """
     if filepath is None:
         filepath = config.PROMPT_DISPLAY_FILE
     
+    if raw_json is None:
+        raw_json = _dumps_pretty(prompts_json)
+    
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     
-    output = {
-        "generated_at": timestamp,
-        "model": config.TEXT_MODEL,
-        "prompts": prompts_json
-    }
+    # Same bytes as _dumps_pretty({"generated_at", "model", "prompts"}): the
+    # pre-serialized prompts are nested one level deeper by re-indenting
+    # (JSON strings never contain raw newlines, so this is safe)
+    output = b"".join((
+        b'{\n  "generated_at": ', orjson.dumps(timestamp),
+        b',\n  "model": ', orjson.dumps(config.TEXT_MODEL),
+        b',\n  "prompts": ', raw_json.replace(b"\n", b"\n  "),
+        b"\n}"
+    ))
     
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(output, f, indent=2, ensure_ascii=False)
+    with open(filepath, 'wb') as f:
+        f.write(output)
     
-    print(f"✅ Prompts saved to: {filepath}")
+    logger.info("✅ Prompts saved to: %s", filepath)
 
 
-def log_prompts_to_text(prompts_json, user_requirements):
+def log_prompts_to_text(prompts_json, user_requirements, segments=None, raw_json=None):
     """
     Log prompts to text file for audit trail
     
     Args:
         prompts_json: Prompts JSON object
         user_requirements: Original user requirements
+        segments: Optional already-extracted segment prompts
+        raw_json: Optional _dumps_pretty(prompts_json) bytes
     """
-    os.makedirs(config.LOG_FOLDER, exist_ok=True)
+    config.ensure_dir(config.LOG_FOLDER)
     
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     
-    with open(config.PROMPT_LOG_FILE, 'a', encoding='utf-8') as f:
-        f.write("\n" + "=" * 80 + "\n")
-        f.write(f"Generated at: {timestamp}\n")
-        f.write(f"Model: {config.TEXT_MODEL}\n")
-        f.write(f"Prompt Format Mode: {config.PROMPT_FORMAT_MODE}\n")  # ← NEW
-        f.write("=" * 80 + "\n\n")
-        
-        f.write("USER REQUIREMENTS:\n")
-        f.write(f"{user_requirements}\n\n")
-        
-        f.write("GENERATED PROMPTS (Raw JSON from LLM):\n")
-        f.write(json.dumps(prompts_json, indent=2, ensure_ascii=False))
-        f.write("\n\n")
-        
-        # Extract and format segment prompts
+    # Extract and format segment prompts (unless the caller already did)
+    if segments is None:
         segments = extract_segment_prompts(prompts_json)
-        f.write("SEGMENT PROMPTS (Formatted for Veo):\n")
-        f.write(f"Mode: {config.PROMPT_FORMAT_MODE}\n")  # ← NEW
-        f.write("-" * 80 + "\n")
-        for seg_num, prompt in segments:
-            f.write(f"\nSegment {seg_num}:\n")
-            f.write(f"{prompt}\n")
-            f.write("-" * 80 + "\n")
     
-    print(f"✅ Prompts logged to: {config.PROMPT_LOG_FILE}")
+    separator = "-" * 80 + "\n"
+    header = (
+        "\n" + "=" * 80 + "\n"
+        f"Generated at: {timestamp}\n"
+        f"Model: {config.TEXT_MODEL}\n"
+        f"Prompt Format Mode: {config.PROMPT_FORMAT_MODE}\n"  # ← NEW
+        + "=" * 80 + "\n\n"
+        "USER REQUIREMENTS:\n"
+        f"{user_requirements}\n\n"
+        "GENERATED PROMPTS (Raw JSON from LLM):\n"
+    )
+    footer = "".join([
+        "\n\n",
+        "SEGMENT PROMPTS (Formatted for Veo):\n",
+        f"Mode: {config.PROMPT_FORMAT_MODE}\n",  # ← NEW
+        separator,
+        *(f"\nSegment {seg_num}:\n{prompt}\n{separator}" for seg_num, prompt in segments)
+    ])
+    
+    # One write per entry; binary mode so the orjson output needs no
+    # decode/encode round trip
+    with open(config.PROMPT_LOG_FILE, 'ab') as f:
+        f.write(b"".join((
+            header.encode('utf-8'),
+            raw_json if raw_json is not None else _dumps_pretty(prompts_json),
+            footer.encode('utf-8')
+        )))
+    
+    logger.info("✅ Prompts logged to: %s", config.PROMPT_LOG_FILE)
 
 def generate_and_process_prompts(
     user_requirements,
@@ -329,14 +710,57 @@ def generate_and_process_prompts(
     # Extract segment prompts
     segment_prompts = extract_segment_prompts(prompts_json)
     
-    print(f"\n📋 Extracted {len(segment_prompts)} segment prompt(s)")
+    logger.info("\n📋 Extracted %d segment prompt(s)", len(segment_prompts))
+    
+    # Serialize once for both the saved file and the text log
+    raw_json = _dumps_pretty(prompts_json)
     
     # Save to file if enabled
     if config.SAVE_PROMPTS_TO_FILE:
-        save_prompts_to_file(prompts_json)
+        save_prompts_to_file(prompts_json, raw_json=raw_json)
     
     # Log to text file
-    log_prompts_to_text(prompts_json, user_requirements)
+    log_prompts_to_text(prompts_json, user_requirements, segments=segment_prompts, raw_json=raw_json)
+    
+    return prompts_json, segment_prompts
+
+
+async def generate_and_process_prompts_async(
+    user_requirements,
+    reference_image_paths=None,
+    total_duration=None,
+    segment_duration=None
+):
+    """
+    Async variant of generate_and_process_prompts
+    
+    The blocking Gemini call runs in a worker thread, and the JSON save and
+    text log are written concurrently instead of one after the other.
+    
+    Returns:
+        tuple: (prompts_json, segment_prompts_list)
+    """
+    prompts_json = await asyncio.to_thread(
+        generate_prompts_with_gemini,
+        user_requirements=user_requirements,
+        reference_image_paths=reference_image_paths,
+        total_duration=total_duration,
+        segment_duration=segment_duration
+    )
+    
+    segment_prompts = extract_segment_prompts(prompts_json)
+    
+    logger.info("\n📋 Extracted %d segment prompt(s)", len(segment_prompts))
+    
+    raw_json = _dumps_pretty(prompts_json)
+    
+    writes = [asyncio.to_thread(
+        log_prompts_to_text, prompts_json, user_requirements,
+        segments=segment_prompts, raw_json=raw_json
+    )]
+    if config.SAVE_PROMPTS_TO_FILE:
+        writes.append(asyncio.to_thread(save_prompts_to_file, prompts_json, raw_json=raw_json))
+    await asyncio.gather(*writes)
     
     return prompts_json, segment_prompts
 
@@ -344,6 +768,7 @@ def generate_and_process_prompts(
 if __name__ == "__main__":
     # Test prompt generation
     print("Testing prompt generation...")
+    config.bootstrap()
     config.validate_config()
     
     # Sample user requirements
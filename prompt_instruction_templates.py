@@ -1,11 +1,36 @@
 # prompt_templates
-SOLID_BACKGROUND_INSTRUCTION = """
+import os
+import re
+import textwrap
+
+# The three planner instructions share their section headers and several
+# boilerplate clauses; each instruction is a tuple of fragments so the
+# shared text is stored a single time.
+
+_SEPARATOR_BAR = "━" * 58 + "\n"
+
+
+def _section(title):
+    """Section heading framed by separator bars"""
+    return "".join((_SEPARATOR_BAR, title, "\n", _SEPARATOR_BAR))
+
+
+_STEP1_HEADER = _section("STEP 1: ANALYZE INPUT IMAGE (MANDATORY)")
+
+_SOLID_PRESERVE_CLAUSE = 'PRESERVE: Exact product appearance from input image including all logos, text, material finishes, and design details without any alterations."'
+_LIFESTYLE_PRESERVE_CLAUSE = 'PRESERVE: Exact product appearance from input image with all logos, text, and design details maintained without alteration."'
+_MARKETING_PROMPT_TAIL = 'TECHNICAL: High-resolution commercial advertising quality, photorealistic product rendering, professional graphic design, balanced visual hierarchy, social media marketing ready.\nPRESERVE: Exact product appearance from input image. Marketing elements enhance but never alter the product itself."'
+_MINIMAL_VIBE_DIVIDER = "--- IF VIBE IS 'MINIMAL & PROFESSIONAL' ---\n"
+_TRENDY_VIBE_DIVIDER = "--- IF VIBE IS 'ENERGETIC & TRENDY' ---\n"
+_CLOSING_NOTE = '***Generate the detailed product description from Step 1 and final prompt (Step 3) for the product imgage provided.*** \n'
+
+_SOLID_BACKGROUND_INSTRUCTION_FRAGMENTS = (
+    """
 ===== STUDIO BACKGROUND IMAGE GENERATION - STRICT PROTOCOL =====
 YOU MUST FOLLOW THESE STEPS IN EXACT ORDER:
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-STEP 1: ANALYZE INPUT IMAGE (MANDATORY)
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-IF INPUT IMAGE IS PROVIDED:
+""",
+    _STEP1_HEADER,
+    """IF INPUT IMAGE IS PROVIDED:
 Examine the image carefully and extract these EXACT details:
 A) PRODUCT IDENTITY:
 What is the exact product shown?
@@ -33,10 +58,9 @@ WRITE THIS ANALYSIS EXPLICITLY BEFORE GENERATING THE PROMPT.
 IF NO INPUT IMAGE:
 Use the provided product type to describe a standard, accurate representation of that product category.
 
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-STEP 2: CONSTRUCT STUDIO SCENE SPECIFICATIONS
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-
+""",
+    _section("STEP 2: CONSTRUCT STUDIO SCENE SPECIFICATIONS"),
+    """
 Now define the studio setup:
 
 BACKGROUND:
@@ -85,10 +109,9 @@ Operational status: OFF/CLOSED/RESTING (no power, no operation)
 
 Configuration: [Specify based on product - doors closed, screens off, blades retracted, etc.]
 
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-STEP 3: GENERATE FINAL PROMPT WITH STRICT FORMAT
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-
+""",
+    _section("STEP 3: GENERATE FINAL PROMPT WITH STRICT FORMAT"),
+    """
 OUTPUT FORMAT (USE EXACTLY THIS STRUCTURE):
 
 "Professional studio product photography.
@@ -103,12 +126,11 @@ STATE: Product in pristine, non-operational condition, [specific state - powered
 
 TECHNICAL: High-resolution commercial product photography, tack-sharp focus throughout entire product, no depth-of-field blur, neutral white balance (5500K), minimal lens distortion, e-commerce platform ready.
 
-PRESERVE: Exact product appearance from input image including all logos, text, material finishes, and design details without any alterations."
-
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-MANDATORY CHECKS BEFORE SUBMITTING PROMPT:
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-
+""",
+    _SOLID_PRESERVE_CLAUSE,
+    "\n\n",
+    _section("MANDATORY CHECKS BEFORE SUBMITTING PROMPT:"),
+    """
 □ Have I described the EXACT product from the input image with specific details?
 □ Have I listed ALL visible brand text/logos exactly as shown?
 □ Have I specified exact colors, materials, and finishes from the input?
@@ -119,18 +141,19 @@ MANDATORY CHECKS BEFORE SUBMITTING PROMPT:
 
 CRITICAL REMINDER: You are NOT creating a new product. You are describing how to photograph the EXACT product shown in the input image in a professional studio setting. Every detail must match the input.
 
-***Generate the detailed product description from Step 1 and final prompt (Step 3) for the product imgage provided.*** 
-"""
+""",
+    _CLOSING_NOTE,
+)
 
-LIFESTYLE_INSTRUCTION = """
+_LIFESTYLE_INSTRUCTION_FRAGMENTS = (
+    """
 ===== LIFESTYLE IMAGE GENERATION - STRICT PROTOCOL =====
 
 YOU MUST FOLLOW THESE STEPS IN EXACT ORDER:
 
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-STEP 1: ANALYZE INPUT IMAGE (MANDATORY)
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-
+""",
+    _STEP1_HEADER,
+    """
 IF INPUT IMAGE IS PROVIDED:
 Examine the image and document these EXACT details:
 
@@ -173,10 +196,9 @@ WRITE THIS ANALYSIS EXPLICITLY.
 IF NO INPUT IMAGE:
 Describe standard accurate features of the stated product type.
 
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-STEP 2: DETERMINE SCENE TYPE FROM THEME GUIDELINES
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-
+""",
+    _section("STEP 2: DETERMINE SCENE TYPE FROM THEME GUIDELINES"),
+    """
 Read the Theme Guidelines and decide:
 
 OPTION A - WITH HUMAN INTERACTION:
@@ -211,10 +233,9 @@ Props positioned to complement, not compete, aim for real-world natural setting
 
 STATE YOUR CHOICE: [ ] Option A - Human Interaction  [ ] Option B - Standalone
 
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-STEP 3: DEFINE LOGICAL ENVIRONMENT
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-
+""",
+    _section("STEP 3: DEFINE LOGICAL ENVIRONMENT"),
+    """
 Based on product type, select appropriate setting where this product ACTUALLY exists/is used:
 
 ENVIRONMENT LOGIC TABLE:
@@ -260,10 +281,9 @@ Lawn mower → Freshly cut grass edge, outdoor setting
 
 Depth: [Sharp throughout OR soft background blur keeping product sharp]
 
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-STEP 4: DEFINE LIGHTING & ATMOSPHERE
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-
+""",
+    _section("STEP 4: DEFINE LIGHTING & ATMOSPHERE"),
+    """
 LIGHTING TYPE:
 [ ] Natural window light (soft, directional)
 [ ] Golden hour sunlight (warm, low-angle)
@@ -283,10 +303,9 @@ Shadow quality: Soft and natural
 
 Time of day suggestion: [Morning/Midday/Afternoon/Evening]
 
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-STEP 5: GENERATE FINAL PROMPT WITH STRICT FORMAT
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-
+""",
+    _section("STEP 5: GENERATE FINAL PROMPT WITH STRICT FORMAT"),
+    """
 FOR HUMAN INTERACTION (Option A):
 
 "Lifestyle product photography with human interaction.
@@ -305,7 +324,9 @@ LIGHTING: [Specific lighting type from Step 4], [color temperature], creating [a
 
 TECHNICAL: Photorealistic lifestyle photography, natural perspective, [depth of field specification], authentic moment, e-commerce ready.
 
-PRESERVE: Exact product appearance from input image with all logos, text, and design details maintained without alteration."
+""",
+    _LIFESTYLE_PRESERVE_CLAUSE,
+    """
 
 FOR STANDALONE (Option B):
 
@@ -325,12 +346,11 @@ LIGHTING: [Specific lighting type from Step 4], [color temperature], creating [a
 
 TECHNICAL: Photorealistic lifestyle photography, natural perspective, [depth of field specification], authentic context, e-commerce ready.
 
-PRESERVE: Exact product appearance from input image with all logos, text, and design details maintained without alteration."
-
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-MANDATORY CHECKS BEFORE SUBMITTING:
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-
+""",
+    _LIFESTYLE_PRESERVE_CLAUSE,
+    "\n\n",
+    _section("MANDATORY CHECKS BEFORE SUBMITTING:"),
+    """
 □ Have I described the EXACT product from input with all specific details?
 □ Have I preserved ALL brand text/logos exactly as shown?
 □ Is the environment logical for where this product is actually used?
@@ -342,16 +362,17 @@ MANDATORY CHECKS BEFORE SUBMITTING:
 CRITICAL: You are describing how to photograph the EXACT input product in a realistic lifestyle context, not inventing a new product.
 
 NOTE:
-***Generate the detailed product description from Step 1 and final prompt (Step 3) for the product imgage provided.*** 
-"""
+""",
+    _CLOSING_NOTE,
+)
 
-MARKETING_CREATIVE_INSTRUCTION = """
+_MARKETING_CREATIVE_INSTRUCTION_FRAGMENTS = (
+    """
 ===== MARKETING CREATIVE IMAGE GENERATION - STRICT PROTOCOL =====
 YOU MUST FOLLOW THESE STEPS IN EXACT ORDER:
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-STEP 1: ANALYZE INPUT IMAGE (MANDATORY)
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-
+""",
+    _STEP1_HEADER,
+    """
 IF INPUT IMAGE IS PROVIDED:
 Document EXACT product specifications:
 COMPLETE PRODUCT DESCRIPTION:
@@ -365,10 +386,9 @@ Unique identifying characteristics:
 WRITE EXPLICIT ANALYSIS.
 IF NO INPUT IMAGE: Use accurate standard features of stated product type.
 
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-STEP 2: EXTRACT MARKETING SPECIFICATIONS FROM USER INPUT
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-From "Marketing Image Details" provided by user, extract:
+""",
+    _section("STEP 2: EXTRACT MARKETING SPECIFICATIONS FROM USER INPUT"),
+    """From "Marketing Image Details" provided by user, extract:
 [NEW] CREATIVE VIBE / TARGET AUDIENCE: (This is the most critical new choice)
 Select a vibe based on the product category or user request. This choice will dictate the options in subsequent steps.
 [ ] A - MINIMAL & PROFESSIONAL: For hardware, home decor, kitchenware, corporate products, B2B. Focus is on clarity, elegance, and a premium feel.
@@ -397,30 +417,33 @@ D - Lifestyle + Overlay (lifestyle scene with promotional graphics)
 [NEW] [ ] E - Dynamic Asymmetry (Product is off-center, balanced by bold text and graphic elements)
 [NEW] [ ] F - Layered Depth (Product, text, and graphics are on different planes, creating a 3D effect)
 SELECTED STYLE: [Choose one based on user request and SELECTED VIBE]
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-STEP 3: DEFINE VISUAL DESIGN ELEMENTS
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-Maintain the same viewing angle/camera angle as in the input product image if possible.
+""",
+    _section("STEP 3: DEFINE VISUAL DESIGN ELEMENTS"),
+    """Maintain the same viewing angle/camera angle as in the input product image if possible.
 [UPDATED] BACKGROUND DESIGN:
---- IF VIBE IS 'MINIMAL & PROFESSIONAL' ---
-Premium products → Deep navy/black/charcoal with subtle gradient OR elegant solid color.
+""",
+    _MINIMAL_VIBE_DIVIDER,
+    """Premium products → Deep navy/black/charcoal with subtle gradient OR elegant solid color.
 Tech products → Clean white/light gray with minimal geometric lines OR a soft gradient.
 Lifestyle products → Soft blurred photo-realistic environment OR a warm, neutral color.
 Eco products → Natural greens/earth tones OR organic textures (wood, paper).
---- IF VIBE IS 'ENERGETIC & TRENDY' ---
-Bold Solid Color: High-contrast, vibrant color (e.g., electric blue, hot pink, sunshine yellow).
+""",
+    _TRENDY_VIBE_DIVIDER,
+    """Bold Solid Color: High-contrast, vibrant color (e.g., electric blue, hot pink, sunshine yellow).
 Dynamic Gradient: A 2-3 color gradient with a clear directional flow (e.g., diagonal, radial burst).
 Abstract Graphic Background: A composition of shapes, lines, and textures.
 Duotone Photo: A background lifestyle image rendered in two high-contrast colors.
 Paper/Concrete Texture: A gritty, textured background for an edgy feel.
 SELECTED BACKGROUND: [Specific color/style with hex code if applicable, based on Vibe]
 [UPDATED] COLOR PALETTE:
---- IF VIBE IS 'MINIMAL & PROFESSIONAL' ---
-Primary: [subtle, deep, or neutral color]
+""",
+    _MINIMAL_VIBE_DIVIDER,
+    """Primary: [subtle, deep, or neutral color]
 Accent: [a single contrasting color for CTA]
 Supporting: [2-3 analogous or muted colors]
---- IF VIBE IS 'ENERGETIC & TRENDY' ---
-Vibrant & Contrasting: 2-3 bold, saturated colors that create high energy.
+""",
+    _TRENDY_VIBE_DIVIDER,
+    """Vibrant & Contrasting: 2-3 bold, saturated colors that create high energy.
 Monochromatic Punch: Shades of one color plus a single, powerful neon accent.
 Retro Revival: A palette inspired by the 70s, 80s, or 90s (e.g., oranges/browns, or pastels/neons).
 SELECTED PALETTE: [Define Primary, Accent, and Supporting colors]
@@ -453,15 +476,16 @@ Bold Outlined Shapes: To create frames or highlight areas.
 Grid or Dot Patterns: A subtle background pattern for a techy feel.
 
 Brush Strokes / Paint Splatters: Adds texture and an artistic flair.
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-STEP 4: DEFINE TEXT PLACEMENT & TYPOGRAPHY
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-[UPDATED] TYPOGRAPHY:
---- IF VIBE IS 'MINIMAL & PROFESSIONAL' ---
-Headline: Bold sans-serif / Elegant serif / Sleek uppercase.
+""",
+    _section("STEP 4: DEFINE TEXT PLACEMENT & TYPOGRAPHY"),
+    """[UPDATED] TYPOGRAPHY:
+""",
+    _MINIMAL_VIBE_DIVIDER,
+    """Headline: Bold sans-serif / Elegant serif / Sleek uppercase.
 Brand/CTA: Clean sans-serif.
---- IF VIBE IS 'ENERGETIC & TRENDY' ---
-Headline: Expressive Display Font (bold, quirky) / Condensed Impact Sans-Serif / Retro Script.
+""",
+    _TRENDY_VIBE_DIVIDER,
+    """Headline: Expressive Display Font (bold, quirky) / Condensed Impact Sans-Serif / Retro Script.
 Brand/CTA: A mix of two complementary fonts (e.g., bold headline, lighter supporting text).
 [UPDATED] TEXT PLACEMENT & EFFECTS:
 BRAND NAME:
@@ -488,10 +512,9 @@ Position: [Top right corner] OR [Overlapping product corner].
 Colors: Urgent reds/yellows OR bold, on-brand colors.
 FOOTER:
 Position: Bottom edge, small and subtle.
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-STEP 5: DEFINE FESTIVE/SEASONAL OVERLAYS (if applicable)
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-IF SEASONAL THEME SELECTED IN STEP 2:
+""",
+    _section("STEP 5: DEFINE FESTIVE/SEASONAL OVERLAYS (if applicable)"),
+    """IF SEASONAL THEME SELECTED IN STEP 2:
 
 CHRISTMAS:
 
@@ -551,10 +574,9 @@ Placement: Corner accents, subtle background elements
 
 DESCRIBE EXACT FESTIVE ELEMENTS: [Based on theme from Step 2]
 This section can be applied to either vibe, though the intensity and style of the elements can be adapted.
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-STEP 6: GENERATE THREE UNIQUE PROMPT VARIATIONS
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-Based on all the analysis and specifications from Steps 1-5, you MUST create THREE DIFFERENT creative variations.
+""",
+    _section("STEP 6: GENERATE THREE UNIQUE PROMPT VARIATIONS"),
+    """Based on all the analysis and specifications from Steps 1-5, you MUST create THREE DIFFERENT creative variations.
 Each variation should maintain the SAME:
 - Product description (from Step 1)
 - Vibe/target audience (from Step 2)
@@ -606,8 +628,9 @@ Call-to-action reading "[EXACT TEXT]" as a [sharp rectangular button] at [positi
 [PROMOTIONAL BADGE if provided]: [Geometric badge shape] displaying "[EXACT TEXT]" positioned [location], in [colors].
 [SEASONAL ELEMENTS if applicable]: [Describe festive elements integrated with geometric style].
 LIGHTING & MOOD: [Bright/dramatic] lighting creating a [modern, energetic, structured] mood.
-TECHNICAL: High-resolution commercial advertising quality, photorealistic product rendering, professional graphic design, balanced visual hierarchy, social media marketing ready.
-PRESERVE: Exact product appearance from input image. Marketing elements enhance but never alter the product itself."
+""",
+    _MARKETING_PROMPT_TAIL,
+    """
 
 prompt 2: "Marketing creative product advertisement image. [VIBE] style - BRAND ESSENCE & THEMED VARIATION.
 PRODUCT: [EXACT complete description from Step 1].
@@ -622,8 +645,9 @@ Call-to-action reading "[EXACT TEXT]" as a [classic rounded rectangle or pill-sh
 [PROMOTIONAL BADGE if provided]: [Classic corner ribbon or circular badge] displaying "[EXACT TEXT]" positioned [location], in [brand colors].
 [SEASONAL ELEMENTS if applicable]: [Describe festive elements as per Step 5 - e.g., "Warm white string lights draped across top, red and gold ornaments in corners, subtle snowflakes"].
 LIGHTING & MOOD: [Professional, polished] lighting creating a [premium, trustworthy, on-brand] mood.
-TECHNICAL: High-resolution commercial advertising quality, photorealistic product rendering, professional graphic design, balanced visual hierarchy, social media marketing ready.
-PRESERVE: Exact product appearance from input image. Marketing elements enhance but never alter the product itself."
+""",
+    _MARKETING_PROMPT_TAIL,
+    """
 
 prompt 3: "Marketing creative product advertisement image. [VIBE] style - EXPERIMENTAL & DYNAMIC VARIATION.
 PRODUCT: [EXACT complete description from Step 1].
@@ -638,8 +662,9 @@ Call-to-action reading "[EXACT TEXT]" as a [unconventional style - bold text wit
 [PROMOTIONAL BADGE if provided]: [Creative badge - starburst, angled banner, loud sticker graphic] displaying "[EXACT TEXT]" positioned [unexpected location - overlapping product, integrated into design], in [bold colors].
 [SEASONAL ELEMENTS if applicable]: [Describe festive elements with creative twist - e.g., "Abstract interpretation of snowflakes as geometric crystals, string lights rendered as neon glow lines"].
 LIGHTING & MOOD: [Dynamic, artistic] lighting creating a [energetic, attention-grabbing, innovative] mood.
-TECHNICAL: High-resolution commercial advertising quality, photorealistic product rendering, professional graphic design, balanced visual hierarchy, social media marketing ready.
-PRESERVE: Exact product appearance from input image. Marketing elements enhance but never alter the product itself."
+""",
+    _MARKETING_PROMPT_TAIL,
+    """
 
 CRITICAL RULES:
 ✓ ALL THREE prompts must maintain exact product description from Step 1
@@ -649,10 +674,9 @@ CRITICAL RULES:
 ✓ Output format MUST be: prompt 1: "..." prompt 2: "..." prompt 3: "..."
 ✓ Product itself remains unchanged - only marketing elements vary
 
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-FINAL OUTPUT REQUIREMENTS - READ CAREFULLY
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-
+""",
+    _section("FINAL OUTPUT REQUIREMENTS - READ CAREFULLY"),
+    """
 After completing your analysis in Steps 1-5, you MUST output EXACTLY THREE prompts in this format:
 
 prompt 1: "Marketing creative product advertisement image (For Instagram, social media). [Full detailed prompt for GEOMETRIC & COLORFUL variation following the structure above]"
@@ -666,4 +690,38 @@ DO NOT use code blocks or formatting markers.
 ONLY output the three prompts in the exact format shown above.
 
 BEGIN YOUR RESPONSE BY COMPLETING STEPS 1-5 FOR YOUR OWN ANALYSIS, THEN OUTPUT THE THREE PROMPTS.
-"""
\ No newline at end of file
+""",
+)
+
+
+# Set COMPACT_PROMPT_INSTRUCTIONS=true to send the planner a compact form
+# of each instruction (no separator bars or blank lines), which trims
+# prompt tokens on every planner call without changing the wording
+_COMPACT_ENV_VAR = "COMPACT_PROMPT_INSTRUCTIONS"
+_BLANK_LINES_RE = re.compile(r"\n\s*\n")
+
+# Instructions are joined on first access (PEP 562) and cached as module
+# attributes, so a worker only builds the modes it actually serves
+_INSTRUCTION_FRAGMENTS = {
+    "SOLID_BACKGROUND_INSTRUCTION": _SOLID_BACKGROUND_INSTRUCTION_FRAGMENTS,
+    "LIFESTYLE_INSTRUCTION": _LIFESTYLE_INSTRUCTION_FRAGMENTS,
+    "MARKETING_CREATIVE_INSTRUCTION": _MARKETING_CREATIVE_INSTRUCTION_FRAGMENTS,
+}
+
+
+def _build_instruction(fragments):
+    """Join an instruction's fragments and trim decoration once per process"""
+    text = textwrap.dedent("".join(fragments)).strip() + "\n"
+    if os.getenv(_COMPACT_ENV_VAR, "").lower() in ("1", "true", "yes"):
+        text = _BLANK_LINES_RE.sub("\n", text.replace(_SEPARATOR_BAR, ""))
+    return text
+
+
+def __getattr__(name):
+    """Join an instruction on first access and cache it as a module attribute"""
+    if name not in _INSTRUCTION_FRAGMENTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = _build_instruction(_INSTRUCTION_FRAGMENTS[name])
+    globals()[name] = value
+    return value
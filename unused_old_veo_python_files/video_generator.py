@@ -3,18 +3,105 @@ Veo 3.1 Video Generation using google-genai SDK (AI Studio)
 Simpler authentication, no quota project required
 """
 
+import os
 import time
-from datetime import datetime
+import atexit
+import random
+import functools
+import threading
+import concurrent.futures
+import importlib.util
+import httpx
+from urllib.parse import urlparse
 from google import genai
-from google.genai import types
+from google.genai import types, errors
 import config
 
+# Operation polling backoff: 2, 3, 4.5, ... seconds capped at 30, with up to
+# +10% jitter so finished segments are noticed quickly and concurrent
+# segments don't poll in lockstep
+POLL_INITIAL_INTERVAL = 2.0
+POLL_MAX_INTERVAL = 30.0
+POLL_BACKOFF = 1.5
+POLL_JITTER = 0.1
+POLL_TIMEOUT = 900  # 15 minutes max per operation
+POLL_REPORT_INTERVAL = 60  # seconds between progress lines
+
+# Rate-limited submissions back off exponentially from RETRY_DELAY up to
+# this cap; other transient failures keep the fixed RETRY_DELAY
+RETRY_BACKOFF_MAX = 300
+_RATE_LIMIT_MARKERS = ("429", "quota", "rate limit", "resource_exhausted")
+
+# Reference image MIME types by file extension
+_EXT_MIME = {
+    '.png': 'image/png',
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.webp': 'image/webp',
+}
+
+
+class _TokenBucket:
+    """Thread-safe token bucket pacing Veo submissions across segment workers"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Takes one token, sleeping until it is available"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            wait = 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+        if wait:
+            time.sleep(wait)
+
+
+# Submissions wait here instead of discovering the RPM quota through 429s;
+# the first batch of concurrent segments goes out without delay
+_SUBMIT_LIMITER = _TokenBucket(config.VEO_REQUESTS_PER_MINUTE / 60, config.MAX_CONCURRENT_SEGMENTS)
+
+
+# Keep-alive connection pool shared by all segment workers' submit/poll
+# calls; HTTP/2 multiplexes them over one TLS connection when the optional
+# h2 package is installed
+_HTTP_CLIENT_ARGS = {
+    "http2": importlib.util.find_spec("h2") is not None,
+    "limits": httpx.Limits(max_connections=16, max_keepalive_connections=16),
+}
+# Per-request timeout (ms); submits and polls return quickly, the long wait
+# happens between polls
+_HTTP_TIMEOUT_MS = 60_000
+
+
+def _truncate(text, limit):
+    """Shorten text to limit characters plus '...' for log lines"""
+    return text if len(text) <= limit else text[:limit] + '...'
+
+
+@functools.lru_cache(maxsize=1)
+def _get_client():
+    """Shared genai client: auth discovery and connection pool set up once per process"""
+    return genai.Client(
+        http_options=types.HttpOptions(
+            timeout=_HTTP_TIMEOUT_MS,
+            client_args=_HTTP_CLIENT_ARGS,
+            async_client_args=_HTTP_CLIENT_ARGS
+        )
+    )
+
 
 class VeoVideoGenerator:
     """Generates videos using google-genai SDK"""
     
     def __init__(self):
-        self.client = genai.Client()  # ← Simple initialization, no project needed!
+        self.client = _get_client()  # ← Simple initialization, no project needed!
         self.model = config.VIDEO_MODEL
     
     def generate_video_segment(
@@ -23,7 +110,10 @@ class VeoVideoGenerator:
         reference_image_gcs_uri,
         output_gcs_uri,
         segment_number=1,
-        seed=None
+        seed=None,
+        mime_type=None,
+        deadline=None,
+        stop_event=None
     ):
         """
         Generate a single video segment using Veo 3.1
@@ -34,12 +124,18 @@ class VeoVideoGenerator:
             output_gcs_uri: GCS URI for output storage
             segment_number: Segment identifier for logging
             seed: Optional seed for reproducibility
+            mime_type: Reference image MIME type, detected from the URI if None
+            deadline: Optional time.monotonic() value polling must not run past
+            stop_event: Optional threading.Event that stops polling early when set
         
         Returns:
-            str: GCS URI of generated video, or None if failed
+            str: GCS URI of generated video, or None if the operation failed
+        
+        Raises:
+            Exception: Submission errors, re-raised for the caller to classify
         """
         print(f"\n🎬 Generating Segment {segment_number}...")
-        print(f"   Prompt: {prompt[:100]}{'...' if len(prompt) > 100 else ''}")
+        print(f"   Prompt: {_truncate(prompt, 100)}")
         print(f"   Reference Image: {reference_image_gcs_uri}")
         print(f"   Resolution: {config.VIDEO_RESOLUTION}")
         print(f"   Aspect Ratio: {config.VIDEO_ASPECT_RATIO}")
@@ -50,10 +146,12 @@ class VeoVideoGenerator:
         try:
             person_gen = "disabled" if not config.ALLOW_PEOPLE_IN_VIDEO else "allow_adult"
             
-            # Detect MIME type from GCS URI
-            mime_type = self._detect_mime_type(reference_image_gcs_uri)
+            # Detect MIME type from GCS URI unless the caller resolved it
+            if mime_type is None:
+                mime_type = self._detect_mime_type(reference_image_gcs_uri)
             
             # VEO API CALL (google-genai SDK pattern)
+            _SUBMIT_LIMITER.acquire()
             operation = self.client.models.generate_videos(
                 model=self.model,
                 prompt=prompt,
@@ -74,7 +172,7 @@ class VeoVideoGenerator:
             print(f"   ✓ Operation submitted: {operation.name}")
             
             # Wait for completion
-            video_uri = self._wait_for_completion(operation, segment_number)
+            video_uri = self._wait_for_completion(operation, segment_number, deadline, stop_event)
             
             return video_uri
             
@@ -82,34 +180,42 @@ class VeoVideoGenerator:
             print(f"   ❌ Generation error: {e}")
             import traceback
             traceback.print_exc()
-            return None
+            raise
     
-    def _wait_for_completion(self, operation, segment_number):
-        """Poll operation until complete"""
+    def _wait_for_completion(self, operation, segment_number, deadline=None, stop_event=None):
+        """Poll operation until complete, giving up at POLL_TIMEOUT, the segment deadline or stop_event"""
         print(f"   ⏳ Waiting for Veo generation...")
         
-        poll_count = 0
-        max_polls = 60  # 15 minutes max (60 * 15s)
+        start = time.monotonic()
+        deadline = min(start + POLL_TIMEOUT, deadline or float("inf"))
+        next_report = start + POLL_REPORT_INTERVAL
+        delay = POLL_INITIAL_INTERVAL
         
-        while not operation.done and poll_count < max_polls:
-            time.sleep(15)
-            poll_count += 1
+        while not operation.done:
+            now = time.monotonic()
+            if now >= deadline:
+                print(f"   ⏱️ Timeout after {int(now - start)}s")
+                return None
+            
+            sleep = min(delay + random.uniform(0, delay * POLL_JITTER), deadline - now)
+            if stop_event is not None:
+                if stop_event.wait(sleep):
+                    print(f"   ⏹️ Batch aborted, no longer waiting on segment {segment_number}")
+                    return None
+            else:
+                time.sleep(sleep)
+            delay = min(delay * POLL_BACKOFF, POLL_MAX_INTERVAL)
             
-            if poll_count % 4 == 0:
-                elapsed = poll_count * 15
-                print(f"      {elapsed}s elapsed...")
+            if time.monotonic() >= next_report:
+                print(f"      {int(time.monotonic() - start)}s elapsed...")
+                next_report += POLL_REPORT_INTERVAL
             
             try:
                 operation = self.client.operations.get(operation)
             except Exception as e:
                 print(f"   ⚠️ Polling error: {e}")
-                time.sleep(5)
                 continue
         
-        if poll_count >= max_polls:
-            print(f"   ⏱️ Timeout after {max_polls * 15}s")
-            return None
-        
         print(f"   ✅ Segment {segment_number} complete!")
         
         # Check for errors
@@ -133,18 +239,26 @@ class VeoVideoGenerator:
             return None
     
     def _detect_mime_type(self, gcs_uri):
-        """Detect MIME type from GCS URI extension"""
-        uri_lower = gcs_uri.lower()
-        
-        if uri_lower.endswith('.png'):
-            return 'image/png'
-        elif uri_lower.endswith('.jpg') or uri_lower.endswith('.jpeg'):
-            return 'image/jpeg'
-        elif uri_lower.endswith('.webp'):
-            return 'image/webp'
-        else:
+        """Detect MIME type from GCS URI extension (query strings ignored)"""
+        ext = os.path.splitext(urlparse(gcs_uri).path)[1].lower()
+        mime_type = _EXT_MIME.get(ext)
+        if mime_type is None:
             print(f"   ⚠️ Unknown image format, defaulting to image/png")
             return 'image/png'
+        return mime_type
+
+
+def _is_rate_limited(error):
+    """True for 429 / quota errors that deserve an exponential backoff"""
+    if isinstance(error, errors.ClientError) and error.code == 429:
+        return True
+    message = str(error).lower()
+    return any(marker in message for marker in _RATE_LIMIT_MARKERS)
+
+
+def _is_fatal(error):
+    """True for auth / invalid-request errors that no retry can fix"""
+    return isinstance(error, errors.ClientError) and not _is_rate_limited(error)
 
 
 def generate_segment_with_retry(
@@ -153,7 +267,10 @@ def generate_segment_with_retry(
     output_storage_uri,
     segment_number,
     seed=None,
-    max_retries=None
+    max_retries=None,
+    generator=None,
+    mime_type=None,
+    stop_event=None
 ):
     """
     Generate video segment with automatic retry logic
@@ -165,12 +282,17 @@ def generate_segment_with_retry(
         segment_number: Segment identifier
         seed: Optional seed
         max_retries: Maximum retry attempts
+        generator: Optional VeoVideoGenerator shared across segments
+        mime_type: Optional primary image MIME type shared across segments
+        stop_event: Optional threading.Event; once set (another segment
+            failed), no further attempts are made
     
     Returns:
         str: GCS URI of generated video, or None if all retries failed
     """
+    cfg = config.CFG
     if max_retries is None:
-        max_retries = config.MAX_RETRIES
+        max_retries = cfg.max_retries
     
     # ============================================================
     # CRITICAL: Use PRIMARY (first) image for ALL segments
@@ -178,34 +300,65 @@ def generate_segment_with_retry(
     # ============================================================
     primary_image_uri = reference_image_gcs_uris[0]
     
-    generator = VeoVideoGenerator()
+    if generator is None:
+        generator = VeoVideoGenerator()
+    if mime_type is None:
+        mime_type = generator._detect_mime_type(primary_image_uri)
+    
+    # Wall-clock budget for the whole segment, so retries can't hold up the batch
+    deadline = time.monotonic() + cfg.segment_deadline
     
     for attempt in range(1, max_retries + 1):
+        if stop_event is not None and stop_event.is_set():
+            print(f"   ⏹️ Batch aborted, not starting attempt {attempt} of segment {segment_number}")
+            return None
+        
         print(f"\n{'='*70}")
         print(f"SEGMENT {segment_number} - Attempt {attempt}/{max_retries}")
         print(f"{'='*70}")
         
         # Log generation start
         log_generation_start(segment_number, prompt, f"attempt_{attempt}")
+        attempt_start = time.monotonic()
         
         # Generate video
-        video_uri = generator.generate_video_segment(
-            prompt=prompt,
-            reference_image_gcs_uri=primary_image_uri,  # ← SAME image for all segments
-            output_gcs_uri=output_storage_uri,
-            segment_number=segment_number,
-            seed=seed
-        )
+        delay = cfg.retry_delay
+        try:
+            video_uri = generator.generate_video_segment(
+                prompt=prompt,
+                reference_image_gcs_uri=primary_image_uri,  # ← SAME image for all segments
+                output_gcs_uri=output_storage_uri,
+                segment_number=segment_number,
+                seed=seed,
+                mime_type=mime_type,
+                deadline=deadline,
+                stop_event=stop_event
+            )
+        except Exception as e:
+            if _is_fatal(e):
+                print(f"   ❌ Non-retryable error, giving up on segment {segment_number}")
+                log_generation_failure(segment_number, str(e))
+                return None
+            if _is_rate_limited(e):
+                delay = min(cfg.retry_delay * 2 ** attempt + random.uniform(0, 1), RETRY_BACKOFF_MAX)
+            video_uri = None
         
         if video_uri:
             print(f"\n   ✅ Segment {segment_number} generated successfully!")
-            log_generation_success(segment_number, video_uri, attempt)
+            log_generation_success(segment_number, video_uri, attempt, time.monotonic() - attempt_start)
             return video_uri
         
         # Retry logic
-        if attempt < max_retries:
-            print(f"   ⏸️ Retrying in {config.RETRY_DELAY} seconds...")
-            time.sleep(config.RETRY_DELAY)
+        if attempt < max_retries and time.monotonic() + delay >= deadline:
+            print(f"   ❌ Segment deadline of {cfg.segment_deadline}s reached, not retrying")
+            log_generation_failure(segment_number, "Segment deadline exceeded")
+            break
+        elif attempt < max_retries:
+            print(f"   ⏸️ Retrying in {delay:.0f} seconds...")
+            if stop_event is not None:
+                stop_event.wait(delay)  # Wakes early if the batch is aborted
+            else:
+                time.sleep(delay)
         else:
             print(f"   ❌ All {max_retries} attempts failed")
             log_generation_failure(segment_number, "Max retries exceeded")
@@ -213,64 +366,87 @@ def generate_segment_with_retry(
     return None
 
 
+# Generation log: one buffered append handle per process, opened on first
+# write. Each record is written whole under the lock so concurrent segment
+# workers never interleave lines.
+_LOG_LOCK = threading.Lock()
+_LOG_HANDLE = None
+
+
+def _write_log(record, flush=False):
+    """Append one log record to the Veo generation log"""
+    global _LOG_HANDLE
+    with _LOG_LOCK:
+        if _LOG_HANDLE is None:
+            config.ensure_dir(config.LOG_FOLDER)
+            _LOG_HANDLE = open(config.VEO_LOG_FILE, 'a', encoding='utf-8', buffering=8192)
+            atexit.register(_LOG_HANDLE.close)
+        _LOG_HANDLE.write(record)
+        if flush:
+            _LOG_HANDLE.flush()
+
+
 def log_generation_start(segment_number, prompt, operation_id):
     """Log video generation start"""
-    import os
-    os.makedirs(os.path.dirname(config.VEO_LOG_FILE), exist_ok=True)
-    
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
     
-    with open(config.VEO_LOG_FILE, 'a', encoding='utf-8') as f:
-        f.write(f"\n{'='*80}\n")
-        f.write(f"[{timestamp}] SEGMENT {segment_number} - STARTED\n")
-        f.write(f"Operation ID: {operation_id}\n")
-        f.write(f"Prompt: {prompt[:200]}{'...' if len(prompt) > 200 else ''}\n")
-        f.write(f"{'='*80}\n")
+    _write_log(
+        f"\n{'='*80}\n"
+        f"[{timestamp}] SEGMENT {segment_number} - STARTED\n"
+        f"Operation ID: {operation_id}\n"
+        f"Prompt: {_truncate(prompt, 200)}\n"
+        f"{'='*80}\n"
+    )
 
 
-def log_generation_success(segment_number, video_uri, attempt):
-    """Log successful video generation"""
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+def log_generation_success(segment_number, video_uri, attempt, elapsed=None):
+    """Log successful video generation, with the attempt's duration if known"""
+    timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
+    duration = f", {elapsed:.0f}s" if elapsed is not None else ""
     
-    with open(config.VEO_LOG_FILE, 'a', encoding='utf-8') as f:
-        f.write(f"[{timestamp}] SEGMENT {segment_number} - SUCCESS (Attempt {attempt})\n")
-        f.write(f"Video URI: {video_uri}\n\n")
+    _write_log(
+        f"[{timestamp}] SEGMENT {segment_number} - SUCCESS (Attempt {attempt}{duration})\n"
+        f"Video URI: {video_uri}\n\n"
+    )
 
 
 def log_generation_failure(segment_number, error_message):
-    """Log failed video generation"""
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    """Log failed video generation (flushed immediately)"""
+    timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
     
-    with open(config.VEO_LOG_FILE, 'a', encoding='utf-8') as f:
-        f.write(f"[{timestamp}] SEGMENT {segment_number} - FAILED\n")
-        f.write(f"Error: {error_message}\n\n")
+    _write_log(
+        f"[{timestamp}] SEGMENT {segment_number} - FAILED\n"
+        f"Error: {error_message}\n\n",
+        flush=True
+    )
 
 
 def generate_all_segments(
     segment_prompts,
     reference_image_gcs_uris,
     project_id=None,
-    seed=None
+    seed=None,
+    gcs_paths=None
 ):
     """
-    Generate all video segments sequentially
+    Generate all video segments concurrently, returned in segment order
     
     Args:
         segment_prompts: List of (segment_number, prompt) tuples
         reference_image_gcs_uris: List of reference image GCS URIs
         project_id: Optional project ID for GCS organization
         seed: Optional seed for consistency
+        gcs_paths: Optional paths dict from get_gcs_paths(), shared with
+            the other pipeline steps
     
     Returns:
         list: List of GCS URIs for generated videos (in order)
     """
-    from gcs_utils import get_gcs_paths
-    
-    gcs_paths = get_gcs_paths(project_id)
+    if gcs_paths is None:
+        from gcs_utils import get_gcs_paths
+        gcs_paths = get_gcs_paths(project_id)
     output_base_uri = f"gs://{config.GCS_BUCKET_NAME}/{gcs_paths['segments']}/"
     
-    generated_videos = []
-    
     print(f"\n{'='*70}")
     print(f"GENERATING {len(segment_prompts)} VIDEO SEGMENT(S)")
     print(f"{'='*70}")
@@ -282,22 +458,68 @@ def generate_all_segments(
         print(f"  Image {idx+1}: {img_uri}")
     print(f"Using PRIMARY image (Image 1) for ALL segments (ensures consistency)")
     
-    for seg_num, prompt in segment_prompts:
-        video_uri = generate_segment_with_retry(
-            prompt=prompt,
-            reference_image_gcs_uris=reference_image_gcs_uris,
-            output_storage_uri=output_base_uri,
-            segment_number=seg_num,
-            seed=seed
-        )
+    # Fail fast on a missing reference image instead of after N Veo submissions
+    from gcs_utils import find_missing_gcs_objects
+    missing = find_missing_gcs_objects(reference_image_gcs_uris)
+    if missing:
+        raise FileNotFoundError(f"Reference image(s) not found in GCS: {', '.join(missing)}")
+    
+    # Segments don't depend on each other (all use the primary image), so
+    # their Veo operations run side by side, capped at MAX_CONCURRENT_SEGMENTS.
+    # Results are taken as they complete, so the first failure stops the
+    # batch: queued segments are cancelled and running ones stop polling
+    # and retrying.
+    generator = VeoVideoGenerator()
+    primary_mime_type = generator._detect_mime_type(reference_image_gcs_uris[0])
+    max_workers = max(1, min(config.MAX_CONCURRENT_SEGMENTS, len(segment_prompts)))
+    stop_event = threading.Event()
+    results = {}
+    failed_segment = None
+    error = None
+    
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(
+                generate_segment_with_retry,
+                prompt=prompt,
+                reference_image_gcs_uris=reference_image_gcs_uris,
+                output_storage_uri=output_base_uri,
+                segment_number=seg_num,
+                seed=seed,
+                generator=generator,
+                mime_type=primary_mime_type,
+                stop_event=stop_event
+            ): seg_num
+            for seg_num, prompt in segment_prompts
+        }
         
-        if video_uri:
-            generated_videos.append(video_uri)
-        else:
-            # Critical failure - cannot continue
-            print(f"\n❌ CRITICAL: Segment {seg_num} generation failed after {config.MAX_RETRIES} attempts")
-            print(f"❌ Cannot continue without all segments in sequence")
-            raise Exception(f"Failed to generate segment {seg_num}")
+        for future in concurrent.futures.as_completed(futures):
+            seg_num = futures[future]
+            try:
+                video_uri = future.result()
+            except Exception as e:
+                error = e
+                video_uri = None
+            
+            if not video_uri:
+                # Critical failure - cannot continue without every segment
+                failed_segment = seg_num
+                stop_event.set()
+                executor.shutdown(wait=False, cancel_futures=True)
+                break
+            results[seg_num] = video_uri
+    
+    # Raised after the pool has drained, which is quick once stop_event is set
+    if error is not None:
+        raise error
+    if failed_segment is not None:
+        # The cause (fatal error, deadline, retries exhausted) is already in the
+        # segment's output and the generation log
+        print(f"\n❌ CRITICAL: Segment {failed_segment} generation failed (see {config.VEO_LOG_FILE})")
+        print(f"❌ Cannot continue without all segments in sequence")
+        raise Exception(f"Failed to generate segment {failed_segment}")
+    
+    generated_videos = [results[seg_num] for seg_num, _ in segment_prompts]
     
     print(f"\n{'='*70}")
     print(f"✅ ALL {len(generated_videos)} SEGMENTS GENERATED SUCCESSFULLY")
@@ -309,6 +531,7 @@ def generate_all_segments(
 if __name__ == "__main__":
     # Test video generation
     print("Testing video generation with google-genai SDK...")
+    config.bootstrap()
     config.validate_config()
     
     print("\n⚠️ This is a test stub. In production, use generate_all_segments()")
@@ -4,10 +4,176 @@ Merges video segments with crossfade transitions
 """
 
 import os
-from moviepy.editor import VideoFileClip, concatenate_videoclips, CompositeVideoClip
+import shutil
+import subprocess
+from contextlib import ExitStack, closing
+import concurrent.futures
 from datetime import datetime
 import config
 
+# MoviePy (and numpy/imageio behind it) is imported inside the functions
+# that use it, so importing this module costs nothing for runs that never
+# merge (e.g. PROMPT_ONLY_MODE)
+
+# Clips opened at once when loading segments (each open probes the file
+# with ffmpeg and starts a reader process, so it is I/O bound)
+MAX_CLIP_LOADERS = 8
+
+
+def _load_clips(video_paths):
+    """
+    Open all segments as VideoFileClips concurrently, preserving order
+    
+    Args:
+        video_paths: List of paths to video files (in order)
+    
+    Returns:
+        list: VideoFileClip objects in the same order as video_paths
+    """
+    for idx, video_path in enumerate(video_paths, 1):
+        if not os.path.exists(video_path):
+            raise FileNotFoundError(f"Video file not found: {video_path}")
+        print(f"   Loading segment {idx}: {os.path.basename(video_path)}")
+    
+    if not video_paths:
+        return []
+    
+    from moviepy.editor import VideoFileClip
+    
+    max_workers = min(MAX_CLIP_LOADERS, len(video_paths))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(VideoFileClip, path) for path in video_paths]
+    
+    # Close whatever did open if any segment failed to load
+    errors = [f.exception() for f in futures if f.exception() is not None]
+    if errors:
+        for future in futures:
+            if future.exception() is None:
+                future.result().close()
+        raise errors[0]
+    
+    return [future.result() for future in futures]
+
+
+def _uniform_segment_infos(video_paths):
+    """
+    Probe segments with ffmpeg and check they can be joined by ffmpeg directly
+    
+    Stream copy and the xfade filter both need every segment to share the
+    same frame size, frame rate and audio layout (true for Veo segments).
+    
+    Args:
+        video_paths: List of paths to video files (in order)
+    
+    Returns:
+        list: ffmpeg_parse_infos dicts per segment, or None if they differ
+    """
+    from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+    
+    infos = [ffmpeg_parse_infos(path) for path in video_paths]
+    layouts = {(tuple(info['video_size']), info['video_fps'], info['audio_found']) for info in infos}
+    if len(layouts) != 1:
+        print(f"   Segments differ in size/fps/audio, using MoviePy instead")
+        return None
+    return infos
+
+
+def _run_ffmpeg(args):
+    """Run the ffmpeg binary MoviePy uses; returns (ok, stderr tail)"""
+    from moviepy.config import get_setting
+    
+    result = subprocess.run(
+        [get_setting("FFMPEG_BINARY"), '-y', '-loglevel', 'error', *args],
+        capture_output=True,
+        text=True
+    )
+    return result.returncode == 0, result.stderr.strip()[-300:]
+
+
+def _stream_copy_concat(video_paths, output_path):
+    """
+    Concatenate segments with ffmpeg's concat demuxer without re-encoding
+    
+    Args:
+        video_paths: List of paths to video files (in order)
+        output_path: Path for output merged video
+    
+    Returns:
+        float: Total duration in seconds, or None if the caller must re-encode
+    """
+    infos = _uniform_segment_infos(video_paths)
+    if infos is None:
+        return None
+    
+    list_path = f"{output_path}.concat.txt"
+    with open(list_path, 'w', encoding='utf-8') as f:
+        for path in video_paths:
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+    
+    try:
+        ok, stderr = _run_ffmpeg(['-f', 'concat', '-safe', '0', '-i', list_path, '-c', 'copy', output_path])
+    finally:
+        os.remove(list_path)
+    
+    if not ok:
+        print(f"   ⚠️ Stream copy failed, re-encoding instead: {stderr}")
+        return None
+    
+    return sum(info['duration'] for info in infos)
+
+
+def _xfade_merge(video_paths, output_path, crossfade_duration):
+    """
+    Crossfade segments in a single ffmpeg pass with the xfade/acrossfade filters
+    
+    Each transition overlaps the end of the running output with the start
+    of the next segment by crossfade_duration seconds.
+    
+    Args:
+        video_paths: List of paths to video files (in order, 2 or more)
+        output_path: Path for output merged video
+        crossfade_duration: Duration of crossfade in seconds
+    
+    Returns:
+        float: Final duration in seconds, or None if the caller must fall back
+    """
+    infos = _uniform_segment_infos(video_paths)
+    if infos is None:
+        return None
+    
+    has_audio = infos[0]['audio_found']
+    inputs = []
+    filters = []
+    for idx, path in enumerate(video_paths):
+        inputs += ['-i', path]
+        # Common timebase/fps/pixel format, as xfade requires identical inputs
+        filters.append(f"[{idx}:v]settb=AVTB,fps={config.VIDEO_FPS},format=yuv420p[v{idx}]")
+    
+    video_label, audio_label = "v0", "0:a"
+    offset = 0.0
+    for idx in range(1, len(video_paths)):
+        offset += infos[idx - 1]['duration'] - crossfade_duration
+        filters.append(
+            f"[{video_label}][v{idx}]xfade=transition=fade:"
+            f"duration={crossfade_duration}:offset={offset:.3f}[x{idx}]"
+        )
+        video_label = f"x{idx}"
+        if has_audio:
+            filters.append(f"[{audio_label}][{idx}:a]acrossfade=d={crossfade_duration}[a{idx}]")
+            audio_label = f"a{idx}"
+    
+    args = inputs + ['-filter_complex', ";".join(filters), '-map', f"[{video_label}]"]
+    args += ['-map', f"[{audio_label}]", '-c:a', 'aac'] if has_audio else ['-an']
+    args += ['-c:v', config.VIDEO_CODEC, '-preset', config.VIDEO_PRESET, output_path]
+    
+    ok, stderr = _run_ffmpeg(args)
+    if not ok:
+        print(f"   ⚠️ ffmpeg crossfade failed, using MoviePy instead: {stderr}")
+        return None
+    
+    return sum(info['duration'] for info in infos) - crossfade_duration * (len(infos) - 1)
+
 
 def merge_videos_with_crossfade(video_paths, output_path, crossfade_duration=None):
     """
@@ -27,91 +193,84 @@ def merge_videos_with_crossfade(video_paths, output_path, crossfade_duration=Non
     print(f"\n🎞️  Merging {len(video_paths)} video segment(s)...")
     print(f"   Crossfade duration: {crossfade_duration}s")
     
+    if not video_paths:
+        raise ValueError("No video clips to merge")
+    
+    for video_path in video_paths:
+        if not os.path.exists(video_path):
+            raise FileNotFoundError(f"Video file not found: {video_path}")
+    
+    # A single Veo segment is already an encoded MP4: copy the file as is
+    if len(video_paths) == 1:
+        print("   Only one segment, copying directly...")
+        shutil.copyfile(video_paths[0], output_path)
+        return output_path
+    
+    # Fast path: ffmpeg crossfades in one native pass; MoviePy's
+    # frame-by-frame compositing is only the fallback
+    print(f"   Applying crossfade transitions (ffmpeg xfade)...")
+    final_duration = _xfade_merge(video_paths, output_path, crossfade_duration)
+    if final_duration is not None:
+        print(f"   Final duration: {final_duration:.1f}s")
+        print(f"   ✅ Video merged successfully!")
+        print(f"   Output: {output_path}")
+        return output_path
+    
+    from moviepy.editor import concatenate_videoclips
+    
     try:
-        # Load all video clips
-        clips = []
-        for idx, video_path in enumerate(video_paths, 1):
-            if not os.path.exists(video_path):
-                raise FileNotFoundError(f"Video file not found: {video_path}")
+        with ExitStack() as stack:
+            # Load all video clips; the stack closes every clip (and the
+            # composite) on the way out, including when a step below fails
+            clips = [stack.enter_context(closing(clip)) for clip in _load_clips(video_paths)]
             
-            print(f"   Loading segment {idx}: {os.path.basename(video_path)}")
-            clip = VideoFileClip(video_path)
-            clips.append(clip)
-        
-        if not clips:
-            raise ValueError("No video clips to merge")
-        
-        # If only one clip, no need to merge
-        if len(clips) == 1:
-            print("   Only one segment, copying directly...")
-            clips[0].write_videofile(
+            # Apply crossfade transitions
+            print(f"   Applying crossfade transitions...")
+            final_clips = []
+            
+            for i, clip in enumerate(clips):
+                if i == 0:
+                    # First clip: fade out at end
+                    final_clips.append(clip.crossfadeout(crossfade_duration))
+                elif i == len(clips) - 1:
+                    # Last clip: fade in at start
+                    final_clips.append(clip.crossfadein(crossfade_duration))
+                else:
+                    # Middle clips: fade in and out
+                    final_clips.append(
+                        clip.crossfadein(crossfade_duration).crossfadeout(crossfade_duration)
+                    )
+            
+            # Concatenate with method='compose' to handle overlapping fades
+            print(f"   Concatenating clips...")
+            final_video = stack.enter_context(closing(concatenate_videoclips(final_clips, method="compose")))
+            
+            # Calculate expected duration
+            total_duration = sum(clip.duration for clip in clips)
+            overlap = crossfade_duration * (len(clips) - 1)
+            expected_duration = total_duration - overlap
+            
+            print(f"   Original total: {total_duration:.1f}s")
+            print(f"   Crossfade overlap: {overlap:.1f}s")
+            print(f"   Final duration: {expected_duration:.1f}s")
+            
+            # Write final video
+            print(f"   Writing final video to: {output_path}")
+            final_video.write_videofile(
                 output_path,
                 codec=config.VIDEO_CODEC,
                 fps=config.VIDEO_FPS,
                 preset=config.VIDEO_PRESET,
-                logger=None  # Suppress moviepy logs
+                logger=None  # Suppress moviepy verbose output
             )
-            clips[0].close()
+            
+            print(f"   ✅ Video merged successfully!")
+            print(f"   Output: {output_path}")
+            
             return output_path
-        
-        # Apply crossfade transitions
-        print(f"   Applying crossfade transitions...")
-        final_clips = []
-        
-        for i, clip in enumerate(clips):
-            if i == 0:
-                # First clip: fade out at end
-                final_clips.append(clip.crossfadeout(crossfade_duration))
-            elif i == len(clips) - 1:
-                # Last clip: fade in at start
-                final_clips.append(clip.crossfadein(crossfade_duration))
-            else:
-                # Middle clips: fade in and out
-                final_clips.append(
-                    clip.crossfadein(crossfade_duration).crossfadeout(crossfade_duration)
-                )
-        
-        # Concatenate with method='compose' to handle overlapping fades
-        print(f"   Concatenating clips...")
-        final_video = concatenate_videoclips(final_clips, method="compose")
-        
-        # Calculate expected duration
-        total_duration = sum(clip.duration for clip in clips)
-        overlap = crossfade_duration * (len(clips) - 1)
-        expected_duration = total_duration - overlap
-        
-        print(f"   Original total: {total_duration:.1f}s")
-        print(f"   Crossfade overlap: {overlap:.1f}s")
-        print(f"   Final duration: {expected_duration:.1f}s")
-        
-        # Write final video
-        print(f"   Writing final video to: {output_path}")
-        final_video.write_videofile(
-            output_path,
-            codec=config.VIDEO_CODEC,
-            fps=config.VIDEO_FPS,
-            preset=config.VIDEO_PRESET,
-            logger=None  # Suppress moviepy verbose output
-        )
-        
-        # Clean up
-        for clip in clips:
-            clip.close()
-        final_video.close()
-        
-        print(f"   ✅ Video merged successfully!")
-        print(f"   Output: {output_path}")
-        
-        return output_path
-        
+            
     except Exception as e:
         print(f"   ❌ Error merging videos: {e}")
-        # Clean up clips on error
-        for clip in clips:
-            try:
-                clip.close()
-            except:
-                pass
         raise
 
 
@@ -129,55 +288,58 @@ def merge_videos_hard_cut(video_paths, output_path):
     """
     print(f"\n🎞️  Merging {len(video_paths)} video segment(s) with hard cuts...")
     
-    try:
-        # Load all video clips
-        clips = []
-        for idx, video_path in enumerate(video_paths, 1):
-            if not os.path.exists(video_path):
-                raise FileNotFoundError(f"Video file not found: {video_path}")
-            
-            print(f"   Loading segment {idx}: {os.path.basename(video_path)}")
-            clip = VideoFileClip(video_path)
-            clips.append(clip)
-        
-        if not clips:
-            raise ValueError("No video clips to merge")
-        
-        # Concatenate directly
-        print(f"   Concatenating clips...")
-        final_video = concatenate_videoclips(clips, method="compose")
-        
-        total_duration = sum(clip.duration for clip in clips)
-        print(f"   Total duration: {total_duration:.1f}s")
-        
-        # Write final video
-        print(f"   Writing final video to: {output_path}")
-        final_video.write_videofile(
-            output_path,
-            codec=config.VIDEO_CODEC,
-            fps=config.VIDEO_FPS,
-            preset=config.VIDEO_PRESET,
-            logger=None
-        )
-        
-        # Clean up
-        for clip in clips:
-            clip.close()
-        final_video.close()
-        
+    if not video_paths:
+        raise ValueError("No video clips to merge")
+    
+    for video_path in video_paths:
+        if not os.path.exists(video_path):
+            raise FileNotFoundError(f"Video file not found: {video_path}")
+    
+    # Fast path: matching segments are joined losslessly without re-encoding
+    total_duration = _stream_copy_concat(video_paths, output_path)
+    if total_duration is not None:
+        print(f"   Total duration: {total_duration:.1f}s (stream copy)")
         print(f"   ✅ Video merged successfully!")
         print(f"   Output: {output_path}")
-        
         return output_path
-        
+    
+    from moviepy.editor import concatenate_videoclips
+    
+    try:
+        with ExitStack() as stack:
+            # Load all video clips; the stack closes every clip (and the
+            # composite) on the way out, including when a step below fails
+            clips = [stack.enter_context(closing(clip)) for clip in _load_clips(video_paths)]
+            
+            # Concatenate directly; "chain" plays same-sized clips back to back
+            # without the per-frame compositing "compose" needs to letterbox
+            # clips of different sizes onto one canvas
+            print(f"   Concatenating clips...")
+            same_size = len({tuple(clip.size) for clip in clips}) == 1
+            final_video = stack.enter_context(closing(
+                concatenate_videoclips(clips, method="chain" if same_size else "compose")
+            ))
+            
+            total_duration = sum(clip.duration for clip in clips)
+            print(f"   Total duration: {total_duration:.1f}s")
+            
+            # Write final video
+            print(f"   Writing final video to: {output_path}")
+            final_video.write_videofile(
+                output_path,
+                codec=config.VIDEO_CODEC,
+                fps=config.VIDEO_FPS,
+                preset=config.VIDEO_PRESET,
+                logger=None
+            )
+            
+            print(f"   ✅ Video merged successfully!")
+            print(f"   Output: {output_path}")
+            
+            return output_path
+            
     except Exception as e:
         print(f"   ❌ Error merging videos: {e}")
-        # Clean up clips on error
-        for clip in clips:
-            try:
-                clip.close()
-            except:
-                pass
         raise
 
 
@@ -191,19 +353,22 @@ def get_video_info(video_path):
     Returns:
         dict: Video information (duration, fps, size, etc.)
     """
+    from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+    
     try:
-        clip = VideoFileClip(video_path)
+        # Header probe only: no reader process or audio setup as with VideoFileClip
+        infos = ffmpeg_parse_infos(video_path)
+        width, height = infos['video_size']
         
         info = {
-            "duration": clip.duration,
-            "fps": clip.fps,
-            "size": clip.size,
-            "width": clip.w,
-            "height": clip.h,
-            "aspect_ratio": f"{clip.w}:{clip.h}"
+            "duration": infos['duration'],
+            "fps": infos['video_fps'],
+            "size": [width, height],
+            "width": width,
+            "height": height,
+            "aspect_ratio": f"{width}:{height}"
         }
         
-        clip.close()
         return info
         
     except Exception as e:
@@ -222,7 +387,7 @@ def log_merge_operation(video_paths, output_path, merge_type="crossfade"):
     """
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     
-    log_file = os.path.join(config.LOG_FOLDER, "video_merge_log.txt")
+    log_file = os.path.join(config.ensure_dir(config.LOG_FOLDER), "video_merge_log.txt")
     
     with open(log_file, 'a', encoding='utf-8') as f:
         f.write(f"\n{'='*80}\n")
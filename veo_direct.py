@@ -7,11 +7,11 @@ GCS is used transparently for API requirements
 
 import os
 import time
+import concurrent.futures
 from datetime import datetime
 from pathlib import Path
 from google import genai
 from google.genai import types
-from google.cloud import storage
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -46,6 +46,7 @@ INPUT_PROMPTS_FOLDER = "inputs/prompts"
 OUTPUT_VIDEOS_FOLDER = "outputs/videos"
 GCS_BASE_FOLDER = "test"  # Root folder in GCS bucket
 GCS_TEMP_IMAGES_FOLDER = "temp_images"  # Temporary image storage
+MAX_UPLOAD_WORKERS = 16  # Concurrent image uploads (latency bound, not bandwidth bound)
 
 # ===========================
 # HELPER FUNCTIONS
@@ -133,20 +134,19 @@ def upload_local_images_to_gcs(storage_client, bucket_name, local_images_folder)
     
     print(f"   Found {len(image_files)} image(s)")
     
+    # One bucket handle shared by all upload threads
     bucket = storage_client.bucket(bucket_name)
-    gcs_uris = []
     
-    for img_path in image_files:
+    def _upload_one(img_path):
         # Upload to temp location: temp_images/image_name.png
         gcs_path = f"{GCS_TEMP_IMAGES_FOLDER}/{img_path.name}"
-        blob = bucket.blob(gcs_path)
-        
-        print(f"   📤 Uploading {img_path.name}...", end=" ")
-        blob.upload_from_filename(str(img_path))
-        
-        gcs_uri = f"gs://{bucket_name}/{gcs_path}"
-        gcs_uris.append(gcs_uri)
-        print(f"✅")
+        bucket.blob(gcs_path).upload_from_filename(str(img_path))
+        print(f"   📤 Uploaded {img_path.name} ✅")
+        return f"gs://{bucket_name}/{gcs_path}"
+    
+    # Uploads run concurrently; map() keeps the URIs in image_files order
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(MAX_UPLOAD_WORKERS, len(image_files))) as executor:
+        gcs_uris = list(executor.map(_upload_one, image_files))
     
     print(f"   ✅ All images uploaded to gs://{bucket_name}/{GCS_TEMP_IMAGES_FOLDER}/")
     return gcs_uris
@@ -375,6 +375,7 @@ def run_pipeline():
     
     # Step 2: Initialize clients
     print(f"\n🔧 Initializing Google Cloud clients...")
+    from google.cloud import storage  # Deferred: only the pipeline run needs GCS
     genai_client = genai.Client()
     storage_client = storage.Client(project=GOOGLE_CLOUD_PROJECT)
     print(f"   ✅ Clients initialized")
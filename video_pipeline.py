@@ -22,6 +22,7 @@ from video_merger import merge_videos_with_crossfade, log_merge_operation
 def log_pipeline_start(user_requirements, reference_images):
     """Log pipeline start"""
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    config.ensure_dir(config.LOG_FOLDER)
     
     with open(config.PIPELINE_LOG_FILE, 'a', encoding='utf-8') as f:
         f.write(f"\n{'='*80}\n")
@@ -37,6 +38,7 @@ def log_pipeline_start(user_requirements, reference_images):
 def log_pipeline_end(success, final_video_uri=None, error=None):
     """Log pipeline completion"""
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    config.ensure_dir(config.LOG_FOLDER)
     
     with open(config.PIPELINE_LOG_FILE, 'a', encoding='utf-8') as f:
         f.write(f"\n{'='*80}\n")
@@ -78,12 +80,17 @@ def run_pipeline(
     print("🎬 PRODUCT DEMO VIDEO GENERATION PIPELINE")
     print("="*80)
     
-    # Validate configuration
+    # Load environment and validate configuration
+    config.bootstrap()
     config.validate_config()
     
     # Log pipeline start
     log_pipeline_start(user_requirements, reference_image_paths)
     
+    # Resolve the project folder once; without a project_id it is
+    # timestamped, so recomputing it per step could split the project
+    gcs_paths = get_gcs_paths(project_id)
+    
     try:
         # ========================================
         # STEP 1: Upload Reference Images to GCS
@@ -94,7 +101,8 @@ def run_pipeline(
         
         reference_image_gcs_uris = upload_reference_images(
             reference_image_paths,
-            project_id=project_id
+            project_id=project_id,
+            gcs_paths=gcs_paths
         )
         
         if not reference_image_gcs_uris:
@@ -145,7 +153,8 @@ def run_pipeline(
             segment_prompts=segment_prompts,
             reference_image_gcs_uris=reference_image_gcs_uris,
             project_id=project_id,
-            seed=seed
+            seed=seed,
+            gcs_paths=gcs_paths
         )
         
         print(f"✅ All {len(segment_video_uris)} segment(s) generated")
@@ -171,7 +180,7 @@ def run_pipeline(
         # Create output filename
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         merged_filename = f"merged_video_{timestamp}.mp4"
-        local_merged_path = os.path.join(config.TEMP_VIDEO_FOLDER, merged_filename)
+        local_merged_path = os.path.join(config.ensure_dir(config.TEMP_VIDEO_FOLDER), merged_filename)
         
         # Merge videos
         merge_videos_with_crossfade(
@@ -195,7 +204,8 @@ def run_pipeline(
         final_video_uri = upload_final_video(
             local_video_path=local_merged_path,
             project_id=project_id,
-            filename=f"final_product_video_{timestamp}.mp4"
+            filename=f"final_product_video_{timestamp}.mp4",
+            gcs_paths=gcs_paths
         )
         
         print(f"✅ Final video uploaded")
@@ -226,7 +236,6 @@ def run_pipeline(
         print(f"  - Audio: {'Enabled' if config.GENERATE_AUDIO else 'Disabled'}")
         
         # Print GCS folder structure
-        gcs_paths = get_gcs_paths(project_id)
         print(f"\n📁 GCS Project Folder:")
         print(f"  gs://{config.GCS_BUCKET_NAME}/{gcs_paths['base']}/")
         print(f"    ├── inputs/       (reference images)")